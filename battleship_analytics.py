@@ -0,0 +1,41 @@
+import sys
+
+from battleship_records import read_records, record_shots
+from text_battleship_ai_analysis import BOARD_SIZE, Board, GameAnalytics, play_round
+
+
+def recorded_games(path, ship_art: list[str], min_shots=0, max_shots=None):
+    """Yields the shot log of every game in a game record file with between min_shots and max_shots shots"""
+    for record in read_records(path, min_shots, max_shots):
+        yield record_shots(record, ship_art)
+
+
+def live_games(AIClass, rounds, BoardClass=Board, uniform_fleets=False):
+    """Plays rounds games and yields the shot log of each as it finishes"""
+    for i in range(rounds):
+        shot_log = []
+        play_round(AIClass, BoardClass, uniform_fleets=uniform_fleets, shot_log=shot_log)
+        yield shot_log
+
+
+def analyse(games, analytics: GameAnalytics = None) -> GameAnalytics:
+    """Adds every game's shot log to analytics, a new GameAnalytics if not given. games can be any iterable of shot
+    logs such as recorded_games or live_games, only one game is held at a time."""
+    if analytics is None:
+        analytics = GameAnalytics()
+    for shot_log in games:
+        analytics.add_game(shot_log)
+    return analytics
+
+
+def main(path, min_shots=0, max_shots=None):
+    """Prints the analytics of the games in a game record file"""
+    board = Board(BOARD_SIZE)
+    analytics = analyse(recorded_games(path, board.SHIP_ART, min_shots, max_shots))
+    print(f"{analytics.games} games in {path}")
+    if analytics.games:
+        analytics.print_summary(board.SHIP_ART, board.SHIP_TILE_TO_NAME)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
@@ -0,0 +1,164 @@
+import numpy as np
+
+from battleship_probability_ai import get_placement_table
+from text_battleship_ai_analysis import BOARD_SIZE, Board, EvaluationTotals, print_summary
+
+# Games are generated and simulated this many at a time to bound memory
+BATCH_GAMES = 100_000
+
+
+def random_fleets(games: int, ship_art: list[str], size: int, rng: np.random.Generator,
+                  uniform=False) -> np.ndarray:
+    """Returns a (games, size * size) array holding the index of the ship in ship_art on each tile, -1 for water.
+
+    By default ships are placed one after another, each drawn uniformly from the placements left open by the ships
+    before it, the same distribution as Board.auto_place_ships. With uniform every complete valid fleet is equally
+    likely: all ships are drawn independently and only the games with overlapping ships are drawn again."""
+    table = get_placement_table(size, ship_art)
+    cell_count = size * size
+    ship_ids = np.full((games, cell_count + 1), -1, dtype=np.int8)
+    if uniform:
+        pending = np.arange(games)
+        while len(pending):
+            fleets = np.full((len(pending), cell_count + 1), -1, dtype=np.int8)
+            tiles_used = np.zeros((len(pending), cell_count + 1), dtype=np.int8)
+            rows = np.arange(len(pending))[:, None]
+            for ship_index, ship in enumerate(ship_art):
+                ship_rows = table.ship_rows[ship[0]]
+                chosen = rng.integers(ship_rows.start, ship_rows.stop, len(pending))
+                cells = table.row_cells[chosen]
+                fleets[rows, cells] = ship_index
+                tiles_used[rows, cells] += 1
+            valid = (tiles_used[:, :cell_count] <= 1).all(axis=1)
+            ship_ids[pending[valid]] = fleets[valid]
+            pending = pending[~valid]
+    else:
+        for ship_index, ship in enumerate(ship_art):
+            ship_rows = table.ship_rows[ship[0]]
+            # Drawing from all placements and drawing again where the ship lands on another one is the same as
+            # drawing uniformly from the open placements, and only the few clashing games are drawn again
+            pending = np.arange(games)
+            while len(pending):
+                cells = table.row_cells[rng.integers(ship_rows.start, ship_rows.stop, len(pending))]
+                is_open = (ship_ids[pending[:, None], cells] < 0).all(axis=1)
+                placed = pending[is_open]
+                ship_ids[placed[:, None], cells[is_open]] = ship_index
+                ship_ids[:, cell_count] = -1
+                pending = pending[~is_open]
+    return ship_ids[:, :cell_count]
+
+
+class BatchSimulator:
+    """Plays many games in lock step. Every step shoots one tile in each active game as a single array operation.
+
+    Game state is a stack of boards: ship_ids (games, size * size) holds the ship index on each tile or -1 for water,
+    shot marks tiles already shot and health holds the tiles left on each ship. Finished games are retired from the
+    arrays once enough of them have built up, and their shot counts are kept in finished_shots."""
+
+    def __init__(self, ship_ids: np.ndarray, ship_art: list[str]):
+        games, cell_count = ship_ids.shape
+        self.ship_ids = ship_ids
+        self.ship_art = ship_art
+        self.shot = np.zeros((games, cell_count), dtype=bool)
+        self.health = np.tile(np.array([len(ship) for ship in ship_art], dtype=np.int16), (games, 1))
+        self.remaining = self.health.sum(axis=1)
+        # Index of each row in the original batch
+        self.game_ids = np.arange(games)
+        self.done = np.zeros(games, dtype=bool)
+        self.steps = 0
+        self.finished_shots = np.zeros(games, dtype=np.int32)
+
+    def active_games(self) -> int:
+        return len(self.game_ids)
+
+    def step(self, cells: np.ndarray) -> (np.ndarray, np.ndarray):
+        """Shoots cells[i] in active game i. Returns hit per game and the index of the ship sunk per game, or -1"""
+        rows = np.arange(len(cells))
+        ships = self.ship_ids[rows, cells]
+        hit = (ships >= 0) & ~self.shot[rows, cells]
+        self.shot[rows, cells] = True
+        hit_rows = rows[hit]
+        hit_ships = ships[hit]
+        self.health[hit_rows, hit_ships] -= 1
+        sunk = np.full(len(cells), -1, dtype=np.int8)
+        sunk[hit_rows] = np.where(self.health[hit_rows, hit_ships] == 0, hit_ships, -1)
+        self.remaining -= hit
+        self.steps += 1
+        newly_done = (self.remaining == 0) & ~self.done
+        self.finished_shots[self.game_ids[newly_done]] = self.steps
+        self.done |= newly_done
+        return hit, sunk
+
+    def retire_finished(self, min_fraction=0.125) -> np.ndarray | None:
+        """Drops finished games from the arrays once they are at least min_fraction of the active games.
+        Returns the boolean mask of rows kept, so batched AIs can drop the same rows, or None if nothing changed"""
+        finished = int(self.done.sum())
+        if not finished or (finished < min_fraction * len(self.done) and finished < len(self.done)):
+            return None
+        keep = ~self.done
+        self.ship_ids = self.ship_ids[keep]
+        self.shot = self.shot[keep]
+        self.health = self.health[keep]
+        self.remaining = self.remaining[keep]
+        self.game_ids = self.game_ids[keep]
+        self.done = self.done[keep]
+        return keep
+
+
+class BatchBaselineAI:
+    """Batched equivalent of BaselineAI: every game shoots its tiles in its own random order without repeats.
+
+    Batched AIs implement reset(games, size, ship_art, rng), choose(simulator) returning one cell per active game,
+    observe(cells, hit, sunk) and retire(keep) to drop the rows the simulator retired."""
+
+    def __init__(self):
+        self.name = "BatchBaselineAI"
+        self.order = None
+
+    def reset(self, games, size, ship_art, rng: np.random.Generator):
+        self.order = rng.random((games, size * size)).argsort(axis=1)
+
+    def choose(self, simulator: BatchSimulator) -> np.ndarray:
+        return self.order[:, simulator.steps]
+
+    def observe(self, cells, hit, sunk):
+        pass
+
+    def retire(self, keep):
+        self.order = self.order[keep]
+
+
+def run_batch(batch_ai, ship_ids: np.ndarray, ship_art: list[str], rng: np.random.Generator) -> np.ndarray:
+    """Plays every fleet in ship_ids to the end with batch_ai and returns the shots each game needed"""
+    simulator = BatchSimulator(ship_ids, ship_art)
+    batch_ai.reset(len(ship_ids), int(np.sqrt(ship_ids.shape[1])), ship_art, rng)
+    while simulator.active_games():
+        cells = batch_ai.choose(simulator)
+        hit, sunk = simulator.step(cells)
+        batch_ai.observe(cells, hit, sunk)
+        keep = simulator.retire_finished()
+        if keep is not None:
+            batch_ai.retire(keep)
+    return simulator.finished_shots
+
+
+def main(BatchAIClass, rounds=1_000_000, seed=None, batch_games=BATCH_GAMES, uniform_fleets=False):
+    """Batched version of the analysis main(): plays rounds games on random boards batch_games at a time and prints
+    the same summary"""
+    rng = np.random.default_rng(seed)
+    ship_art = Board(BOARD_SIZE).SHIP_ART
+    fleet_tiles = sum(map(len, ship_art))
+    batch_ai = BatchAIClass()
+    totals = EvaluationTotals()
+    for first_round in range(0, rounds, batch_games):
+        games = min(batch_games, rounds - first_round)
+        ship_ids = random_fleets(games, ship_art, BOARD_SIZE, rng, uniform_fleets)
+        # Every ship tile is hit exactly once before a game ends, so hits per game is always fleet_tiles
+        for shots in run_batch(batch_ai, ship_ids, ship_art, rng).tolist():
+            totals.add_game(shots, fleet_tiles)
+        print(f"interval {first_round}")
+    print_summary(batch_ai.name, totals)
+
+
+if __name__ == '__main__':
+    main(BatchBaselineAI, 1_000_000)
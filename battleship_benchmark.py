@@ -0,0 +1,194 @@
+import gc
+import json
+import platform
+import random
+import sys
+from copy import deepcopy
+from functools import partial
+from time import perf_counter_ns
+
+from text_battleship_ai_analysis import BOARD_SIZE, AIConditional, BaselineAI, Board
+
+BENCHMARK_SEED = 2024
+# Games played to collect the AIConditional states each AI benchmark replays
+RECORDED_GAMES = 20
+# A benchmark is a regression if it is this fraction slower than the baseline
+REGRESSION_THRESHOLD = 0.10
+
+
+def fleet_boards(BoardClass, count) -> list:
+    """Returns count boards with ships placed from the benchmark seed"""
+    random.seed(BENCHMARK_SEED)
+    boards = []
+    for i in range(count):
+        board = BoardClass(BOARD_SIZE)
+        board.auto_place_ships()
+        boards.append(board)
+    return boards
+
+
+def action_path(ai: AIConditional, hit, sunk) -> str:
+    """Returns which path of get_AI_action these arguments take: seek, attack or flank"""
+    if sunk:
+        return "attack" if any(hit_tile not in sunk for hit_tile in ai.active_hits) else "seek"
+    if not hit:
+        return "seek" if ai.mode == "seek" else "flank"
+    return "attack"
+
+
+def record_ai_states(BoardClass) -> dict[str, list]:
+    """Plays seeded games and returns a copy of the AI and its arguments before every get_AI_action call,
+    grouped by the path the call takes"""
+    states = {"seek": [], "attack": [], "flank": []}
+    for board in fleet_boards(BoardClass, RECORDED_GAMES):
+        ai = AIConditional(board)
+        hit, sunk, ship_tile, game_over = False, [], "", False
+        while not game_over:
+            states[action_path(ai, hit, sunk)].append(deepcopy((ai, (hit, sunk, ship_tile))))
+            x, y = ai.get_AI_action(hit, sunk, ship_tile)
+            hit, sunk, ship_tile, game_over = board.shoot(x, y)
+    return states
+
+
+def setup_shoot(BoardClass) -> list:
+    boards = fleet_boards(BoardClass, 10)
+    cells = [(x, y) for x in range(BOARD_SIZE) for y in range(BOARD_SIZE)]
+    calls = []
+    for board in boards:
+        random.shuffle(cells)
+        calls += [partial(board.shoot, x, y) for x, y in cells]
+    return calls
+
+
+def setup_undo_shoot(BoardClass) -> list:
+    """Takes every shot of the shoot benchmark, so the calls undo them in reverse"""
+    calls = []
+    for shoot in setup_shoot(BoardClass):
+        board = shoot.func.__self__
+        if board.undo_journal is None:
+            board.enable_undo()
+        shoot()
+        calls.append(board.undo_shoot)
+    return calls
+
+
+def setup_clone(BoardClass) -> list:
+    calls = []
+    for board in fleet_boards(BoardClass, 10):
+        for x in range(0, BOARD_SIZE, 2):
+            board.shoot(x, x)
+        calls += [board.clone] * 10
+    return calls
+
+
+def setup_auto_place_ships(BoardClass) -> list:
+    return [BoardClass(BOARD_SIZE).auto_place_ships for i in range(100)]
+
+
+def setup_is_valid_ship_location(BoardClass) -> list:
+    board = fleet_boards(BoardClass, 1)[0]
+    calls = []
+    for ship in board.SHIP_ART:
+        for x in range(BOARD_SIZE):
+            for y in range(BOARD_SIZE):
+                for orientation in ("H", "V"):
+                    calls.append(partial(board.is_valid_ship_location,
+                                         board.generate_ship_positions(ship, x, y, orientation)))
+    return calls
+
+
+def setup_ai_path(recorded_states, path) -> list:
+    return [partial(ai.get_AI_action, *arguments) for ai, arguments in deepcopy(recorded_states[path])]
+
+
+def setup_seek(recorded_states) -> list:
+    return [ai.seek for ai, arguments in deepcopy(recorded_states["seek"])]
+
+
+def setup_baseline_ai(BoardClass) -> list:
+    calls = []
+    for i in range(10):
+        ai = BaselineAI(BoardClass(BOARD_SIZE))
+        calls += [ai.get_AI_action] * (BOARD_SIZE * BOARD_SIZE)
+    return calls
+
+
+def time_calls(name, setup, repeats) -> dict:
+    """Runs every call setup() returns, repeats times on fresh inputs, and returns the best time per call"""
+    best = None
+    for i in range(repeats):
+        calls = setup()
+        # Calls that draw random numbers draw the same ones every run
+        random.seed(f"{BENCHMARK_SEED}:{name}")
+        # Like timeit, keep garbage collection of the prepared inputs out of the timings
+        gc.disable()
+        start = perf_counter_ns()
+        for call in calls:
+            call()
+        elapsed = (perf_counter_ns() - start) / len(calls)
+        gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return {"ns_per_call": best, "calls": len(calls)}
+
+
+def run_benchmarks(BoardClass=Board, repeats=5) -> dict[str, dict]:
+    recorded_states = record_ai_states(BoardClass)
+    benchmarks = {
+        "Board.shoot": partial(setup_shoot, BoardClass),
+        "Board.auto_place_ships": partial(setup_auto_place_ships, BoardClass),
+        "Board.is_valid_ship_location": partial(setup_is_valid_ship_location, BoardClass),
+        "Board.clone": partial(setup_clone, BoardClass),
+        "Board.undo_shoot": partial(setup_undo_shoot, BoardClass),
+        "AIConditional.get_AI_action[seek]": partial(setup_ai_path, recorded_states, "seek"),
+        "AIConditional.get_AI_action[attack]": partial(setup_ai_path, recorded_states, "attack"),
+        "AIConditional.get_AI_action[flank]": partial(setup_ai_path, recorded_states, "flank"),
+        "AIConditional.seek": partial(setup_seek, recorded_states),
+        "BaselineAI.get_AI_action": partial(setup_baseline_ai, BoardClass),
+    }
+    return {name: time_calls(name, setup, repeats) for name, setup in benchmarks.items()}
+
+
+def find_regressions(results, baseline, threshold=REGRESSION_THRESHOLD) -> list[str]:
+    """Returns the names of benchmarks more than threshold slower than in baseline"""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result["ns_per_call"] > baseline[name]["ns_per_call"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results, baseline=None, regressions=()):
+    for name, result in results.items():
+        line = f"{name:<40}{result['ns_per_call']:>12.0f} ns/call"
+        if baseline and name in baseline:
+            change = result["ns_per_call"] / baseline[name]["ns_per_call"] - 1
+            line += f"  {change:+.1%} vs baseline"
+            if name in regressions:
+                line += "  REGRESSION"
+        print(line)
+
+
+def main(output_path="benchmark_results.json", baseline_path=None, threshold=REGRESSION_THRESHOLD,
+         BoardClass=Board, repeats=5) -> list[str]:
+    """Times the engine hot paths, saves the results to output_path and compares them with the results saved in
+    baseline_path. Returns the names of the benchmarks that regressed by more than threshold."""
+    results = run_benchmarks(BoardClass, repeats)
+    with open(output_path, "w") as file:
+        json.dump({"python": platform.python_version(), "board": BoardClass.__name__, "seed": BENCHMARK_SEED,
+                   "results": results}, file, indent=2)
+    baseline = None
+    regressions = []
+    if baseline_path:
+        with open(baseline_path) as file:
+            baseline = json.load(file)["results"]
+        regressions = find_regressions(results, baseline, threshold)
+    print_results(results, baseline, regressions)
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) more than {threshold:.0%} slower than {baseline_path}")
+    return regressions
+
+
+if __name__ == '__main__':
+    # python battleship_benchmark.py [baseline.json] exits with 1 if any benchmark regressed
+    sys.exit(1 if main(baseline_path=sys.argv[1] if len(sys.argv) > 1 else None) else 0)
@@ -0,0 +1,295 @@
+from text_battleship_ai_analysis import Board
+
+# Single bit masks for each cell id, shared by every board of the same size so shoot never shifts big ints.
+_CELL_BITS = {}
+
+
+def cell_bits(size: int) -> list[int]:
+    """Returns [1 << cell for every cell] of a size by size board"""
+    if size not in _CELL_BITS:
+        _CELL_BITS[size] = [1 << cell for cell in range(size * size)]
+    return _CELL_BITS[size]
+
+
+class BitBoard(Board):
+    """Board that stores its state as integer bitmasks instead of 10x10 lists of strings.
+
+    Cell (x, y) is bit x * size + y. Each ship has its own mask, plus masks of all ship tiles, all shots and unhit
+    ship tiles from which hits and misses follow, so shoot, is_valid_ship_location and is_game_over are a few bit
+    operations. private_board and public_board are built on
+    first access and then kept in sync, so print_board and the existing AIs work unchanged."""
+
+    def __init__(self, size: int, ship_art: list[str] = None):
+        # Bitmask of each ship's tiles keyed by ship tile, e.g. "C"
+        self.ship_masks = {}
+        # Ship tile at each cell id, "" for water. Used to find which ship was hit in O(1).
+        self.cell_to_ship = []
+        self.cell_bits = cell_bits(size)
+        # Every ship tile, every tile shot at and the ship tiles not hit yet. Hits and misses are derived from these
+        # so shoot and is_game_over only have to update and test one mask each.
+        self.fleet_mask = 0
+        self.shot_mask = 0
+        self.unhit_mask = 0
+        self.sunk_mask = 0
+        self.grids_built = False
+        super().__init__(size, ship_art)
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails, so once a grid is built it is a plain attribute again and the AIs
+        # reading it cell by cell pay nothing extra.
+        if name == "private_board":
+            self.private_board = self.build_grid(showShips=True)
+            self.grids_built = True
+            return self.private_board
+        if name == "public_board":
+            self.public_board = self.build_grid(showShips=False)
+            self.grids_built = True
+            return self.public_board
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def initialise_board(self, size):
+        """Resets all masks to an empty size by size board containing only water"""
+        self.ship_masks = {}
+        self.cell_to_ship = [""] * (size * size)
+        self.cell_bits = cell_bits(size)
+        self.fleet_mask = 0
+        self.shot_mask = 0
+        self.unhit_mask = 0
+        self.sunk_mask = 0
+        # Drop any built grids, they are rebuilt from the masks when next needed
+        self.__dict__.pop("private_board", None)
+        self.__dict__.pop("public_board", None)
+        self.grids_built = False
+
+    @property
+    def hit_mask(self) -> int:
+        return self.fleet_mask & self.shot_mask
+
+    @property
+    def miss_mask(self) -> int:
+        return self.shot_mask & ~self.fleet_mask
+
+    def positions_to_mask(self, positions) -> int:
+        """Returns the bitmask covering a list of [x, y] positions"""
+        mask = 0
+        for x, y in positions:
+            mask |= self.cell_bits[x * self.board_width + y]
+        return mask
+
+    def get_tile(self, x, y, showShips=False) -> str:
+        """Returns the tile shown at (x, y) on the private board (showShips) or the public board"""
+        bit = self.cell_bits[x * self.board_width + y]
+        if bit & self.sunk_mask:
+            return self.SUNK_TILE
+        if bit & self.hit_mask:
+            return self.HIT_TILE
+        if bit & self.miss_mask:
+            return self.MISS_TILE
+        if showShips and bit & self.fleet_mask:
+            return self.cell_to_ship[x * self.board_width + y]
+        return self.WATER_TILE
+
+    def build_grid(self, showShips=False) -> list[list[str]]:
+        """Builds the string grid used by print_board and the AIs from the masks"""
+        grid = [[self.WATER_TILE] * self.board_width for i in range(self.board_width)]
+        # Only visit tiles that are not water
+        remaining = self.shot_mask | self.fleet_mask if showShips else self.shot_mask
+        while remaining:
+            lowest_bit = remaining & -remaining
+            remaining ^= lowest_bit
+            x, y = divmod(lowest_bit.bit_length() - 1, self.board_width)
+            grid[x][y] = self.get_tile(x, y, showShips)
+        return grid
+
+    def set_tile(self, x, y, private_tile, public_tile=None):
+        """Writes a tile into whichever string grids have already been built"""
+        grids = self.__dict__
+        if "private_board" in grids:
+            grids["private_board"][x][y] = private_tile
+        if public_tile is not None and "public_board" in grids:
+            grids["public_board"][x][y] = public_tile
+
+    def is_on_board(self, x, y):
+        return (0 <= x < self.board_width) and (0 <= y < self.board_width)
+
+    def is_water_tile(self, x, y):
+        return not self.cell_bits[x * self.board_width + y] & (self.fleet_mask | self.shot_mask)
+
+    def is_fire_tile(self, x, y):
+        return bool(self.cell_bits[x * self.board_width + y] & self.hit_mask & ~self.sunk_mask)
+
+    def is_miss_tile(self, x, y):
+        return bool(self.cell_bits[x * self.board_width + y] & self.miss_mask)
+
+    def is_ship_tile(self, x, y):
+        return bool(self.cell_bits[x * self.board_width + y] & self.unhit_mask)
+
+    def shot_cells(self) -> list[int]:
+        """Returns the cell ids of every tile shot at, which are the tiles of the public board that are not water"""
+        cells = []
+        remaining = self.shot_mask
+        while remaining:
+            lowest_bit = remaining & -remaining
+            remaining ^= lowest_bit
+            cells.append(lowest_bit.bit_length() - 1)
+        return cells
+
+    def is_valid_ship_location(self, ship_positions: list[int, int]):
+        """Returns true if all proposed position of a ship on water tiles and within the board"""
+        for x, y in ship_positions:
+            if not self.is_on_board(x, y):
+                return False
+        return not self.positions_to_mask(ship_positions) & (self.fleet_mask | self.shot_mask)
+
+    def place_ship(self, ship: str, ship_positions: list[list[int]]):
+        """Places a ship on the private board, creates a healthbar for the ship and tracks the position of the ship"""
+        ship_letter = ship[0]
+        mask = self.positions_to_mask(ship_positions)
+        for x, y in ship_positions:
+            self.cell_to_ship[x * self.board_width + y] = ship_letter
+            self.set_tile(x, y, ship_letter)
+        if ship_letter not in self.ship_health_bars:
+            self.remaining_health += len(ship)
+        self.ship_masks[ship_letter] = self.ship_masks.get(ship_letter, 0) | mask
+        self.fleet_mask |= mask
+        self.unhit_mask |= mask & ~self.shot_mask
+        self.ship_positions.setdefault(ship_letter, ship_positions)
+        self.ship_health_bars.setdefault(ship_letter, len(ship))
+
+    def mark_ship_sunk(self, ship_code):
+        """Change hit tiles of a sunk ship to sunk tiles on both private and public board"""
+        positions = self.ship_positions[ship_code]
+        old_tiles = [self.get_tile(x, y) for x, y in positions] if self.subscribers else None
+        self.sunk_mask |= self.ship_masks[ship_code]
+        sunk = []
+        for i, (x, y) in enumerate(positions):
+            if self.grids_built:
+                self.set_tile(x, y, self.SUNK_TILE, self.SUNK_TILE)
+            if old_tiles:
+                self.publish(x, y, old_tiles[i], self.SUNK_TILE, ship_code)
+            sunk.append([x, y])
+        return sunk
+
+    def is_game_over(self):
+        """If every ship tile has been hit, return True"""
+        return not self.unhit_mask
+
+    def shoot(self, x, y) -> (bool, list[list[int]], str, bool):
+        """Returns hit, sunk, ship_tile, is_game_over"""
+        cell = x * self.board_width + y
+        bit = self.cell_bits[cell]
+        if bit & self.shot_mask:
+            # Shooting a tile twice changes nothing, same as Board
+            if self.undo_journal is not None:
+                self.undo_journal.append((x, y, None))
+            return False, [], "", not self.unhit_mask
+        if self.undo_journal is not None:
+            self.undo_journal.append((x, y, self.cell_to_ship[cell]))
+        ship_tile = self.cell_to_ship[cell]
+        if not ship_tile:
+            self.shot_mask |= bit
+            if self.grids_built:
+                self.set_tile(x, y, self.MISS_TILE, self.MISS_TILE)
+            self.publish(x, y, self.WATER_TILE, self.MISS_TILE)
+            return False, [], "", not self.unhit_mask
+
+        health_bars = self.ship_health_bars
+        health_bars[ship_tile] -= 1
+        self.remaining_health -= 1
+        sunk = []
+        if not health_bars[ship_tile]:
+            # Sink before marking the shot so mark_ship_sunk still reads the tile shot as water
+            sunk = self.mark_ship_sunk(ship_tile)
+        self.shot_mask |= bit
+        self.unhit_mask ^= bit
+        if not sunk:
+            if self.grids_built:
+                self.set_tile(x, y, self.HIT_TILE, self.HIT_TILE)
+            self.publish(x, y, self.WATER_TILE, self.HIT_TILE)
+        return True, sunk, ship_tile, not self.unhit_mask
+
+    def undo_shoot(self):
+        """Reverts the last shot recorded since enable_undo, publishing the changes"""
+        x, y, ship_tile = self.undo_journal.pop()
+        if ship_tile is None:
+            return
+        bit = self.cell_bits[x * self.board_width + y]
+        if not ship_tile:
+            self.shot_mask ^= bit
+            if self.grids_built:
+                self.set_tile(x, y, self.WATER_TILE, self.WATER_TILE)
+            self.publish(x, y, self.MISS_TILE, self.WATER_TILE)
+            return
+        old_tile = self.HIT_TILE
+        if not self.ship_health_bars[ship_tile]:
+            # The shot sank the ship, so the other tiles of the ship go back to hit tiles
+            old_tile = self.SUNK_TILE
+            self.sunk_mask &= ~self.ship_masks[ship_tile]
+            for ship_x, ship_y in self.ship_positions[ship_tile]:
+                if ship_x != x or ship_y != y:
+                    if self.grids_built:
+                        self.set_tile(ship_x, ship_y, self.HIT_TILE, self.HIT_TILE)
+                    self.publish(ship_x, ship_y, self.SUNK_TILE, self.HIT_TILE)
+        self.ship_health_bars[ship_tile] += 1
+        self.remaining_health += 1
+        self.shot_mask ^= bit
+        self.unhit_mask |= bit
+        if self.grids_built:
+            self.set_tile(x, y, ship_tile, self.WATER_TILE)
+        self.publish(x, y, old_tile, self.WATER_TILE)
+
+    def snapshot(self) -> tuple:
+        """Returns the game state packed into an immutable tuple for restore. Mostly the masks, which are ints."""
+        return (self.fleet_mask, self.shot_mask, self.unhit_mask, self.sunk_mask, tuple(self.cell_to_ship),
+                tuple(self.ship_masks.items()), tuple(self.ship_positions.items()),
+                tuple(self.ship_health_bars.items()), self.remaining_health)
+
+    def restore(self, snapshot: tuple):
+        """Puts the board back to the state of a snapshot, publishing every tile of the public board that changes.
+        The undo journal, if enabled, is cleared."""
+        # Only tiles shot, sunk or holding a different ship in one state but not the other can look different on the
+        # public board
+        changed = 0
+        if self.subscribers:
+            fleet_mask, shot_mask, unhit_mask, sunk_mask = snapshot[:4]
+            changed = (self.shot_mask ^ shot_mask) | (self.sunk_mask ^ sunk_mask)
+            changed |= (self.fleet_mask ^ fleet_mask) & (self.shot_mask | shot_mask)
+        old_tiles = {}
+        while changed:
+            lowest_bit = changed & -changed
+            changed ^= lowest_bit
+            cell = lowest_bit.bit_length() - 1
+            old_tiles[cell] = self.get_tile(*divmod(cell, self.board_width))
+        (self.fleet_mask, self.shot_mask, self.unhit_mask, self.sunk_mask, cell_to_ship, ship_masks, ship_positions,
+         ship_health_bars, self.remaining_health) = snapshot
+        self.cell_to_ship = list(cell_to_ship)
+        self.ship_masks = dict(ship_masks)
+        self.ship_positions = dict(ship_positions)
+        self.ship_health_bars = dict(ship_health_bars)
+        # Grids are rebuilt from the masks when next needed
+        self.__dict__.pop("private_board", None)
+        self.__dict__.pop("public_board", None)
+        self.grids_built = False
+        for cell, old_tile in old_tiles.items():
+            x, y = divmod(cell, self.board_width)
+            new_tile = self.get_tile(x, y)
+            if new_tile != old_tile:
+                self.publish(x, y, old_tile, new_tile)
+        if self.undo_journal is not None:
+            self.undo_journal = []
+
+    def clone(self) -> "BitBoard":
+        """Returns an independent copy of the game state, much faster than deepcopy. Subscribers, the undo journal and
+        any built grids are not copied."""
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.__dict__.pop("private_board", None)
+        clone.__dict__.pop("public_board", None)
+        clone.grids_built = False
+        clone.cell_to_ship = self.cell_to_ship.copy()
+        clone.ship_masks = self.ship_masks.copy()
+        clone.ship_positions = self.ship_positions.copy()
+        clone.ship_health_bars = self.ship_health_bars.copy()
+        clone.subscribers = []
+        clone.undo_journal = None
+        return clone
@@ -0,0 +1,273 @@
+import os
+import random
+import sys
+from collections import OrderedDict
+
+from battleship_placements import get_placement_index
+from text_battleship_ai_analysis import CellPool
+
+# Shots looked ahead and the most likely tiles tried at each step of the look-ahead
+SEARCH_DEPTH = 2
+BRANCHING = 4
+# Memory the transposition table may use before the least recently used positions are dropped
+TABLE_MEMORY_LIMIT = 64 * 1024 * 1024
+
+
+class TranspositionTable:
+    """Least recently used cache of evaluated positions with a cap on the memory it uses. Memory is estimated from the
+    size of the keys and values stored, so the cap is approximate."""
+
+    def __init__(self, memory_limit=TABLE_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self.entries = OrderedDict()
+        self.memory_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the value stored for key or None, marking it as recently used"""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if key in self.entries:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = value
+        self.memory_used += entry_size(key, value)
+        while self.memory_used > self.memory_limit and self.entries:
+            old_key, old_value = self.entries.popitem(last=False)
+            self.memory_used -= entry_size(old_key, old_value)
+            self.evictions += 1
+
+    def statistics(self) -> "TableStatistics":
+        return TableStatistics(self.hits, self.misses, self.evictions,
+                               {os.getpid(): (len(self.entries), self.memory_used, self.memory_limit)})
+
+    def hit_rate(self) -> float:
+        return self.statistics().hit_rate()
+
+    def report(self) -> str:
+        return self.statistics().report()
+
+
+class TableStatistics:
+    """Lookups, evictions and size of the transposition tables of one or more processes. Statistics of shards played
+    by other processes can be merged into one, see text_battleship_ai_analysis.play_shard"""
+
+    def __init__(self, hits=0, misses=0, evictions=0, tables: dict = None):
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+        # (positions, bytes used, bytes allowed) of the table of each process by process id
+        self.tables = {} if tables is None else tables
+
+    def since(self, earlier: "TableStatistics") -> "TableStatistics":
+        """Returns the lookups and evictions made since earlier, with the tables as they are now"""
+        return TableStatistics(self.hits - earlier.hits, self.misses - earlier.misses,
+                               self.evictions - earlier.evictions, dict(self.tables))
+
+    def merge(self, other: "TableStatistics"):
+        self.hits += other.hits
+        self.misses += other.misses
+        self.evictions += other.evictions
+        # A process's table only grows until it is full, so the largest size seen is the latest
+        for process, table in other.tables.items():
+            self.tables[process] = max(self.tables.get(process, table), table)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> str:
+        positions = sum(table[0] for table in self.tables.values())
+        memory_used = sum(table[1] for table in self.tables.values())
+        memory_limit = sum(table[2] for table in self.tables.values())
+        return (f"Transposition table{'s' if len(self.tables) > 1 else ''}: {positions} positions, "
+                f"{memory_used / 2 ** 20:.1f} MiB of {memory_limit / 2 ** 20:.1f} MiB"
+                f"{f' over {len(self.tables)} processes' if len(self.tables) > 1 else ''}, "
+                f"hit rate {self.hit_rate() * 100:.1f}% ({self.hits} hits, {self.misses} misses), "
+                f"{self.evictions} evicted")
+
+
+def entry_size(key, value) -> int:
+    """Approximate bytes used by one table entry, counting the key tuple, its items and the dict slot"""
+    return sys.getsizeof(key) + sum(map(sys.getsizeof, key)) + sys.getsizeof(value) + 100
+
+
+# Table shared by every ExpectimaxAI in this process that is not given its own, so positions carry over between games
+shared_table = TranspositionTable()
+
+
+def symmetry_bits(size: int) -> list[list[int]]:
+    """Returns, for each of the 8 rotations and reflections of the board, the bit each cell id moves to"""
+    last = size - 1
+    transforms = [lambda x, y: (x, y), lambda x, y: (y, last - x), lambda x, y: (last - x, last - y),
+                  lambda x, y: (last - y, x), lambda x, y: (y, x), lambda x, y: (last - x, y),
+                  lambda x, y: (x, last - y), lambda x, y: (last - y, last - x)]
+    tables = []
+    for transform in transforms:
+        table = []
+        for cell in range(size * size):
+            x, y = transform(*divmod(cell, size))
+            table.append(1 << (x * size + y))
+        tables.append(table)
+    return tables
+
+
+class ExpectimaxAI:
+    """AI that looks a few shots ahead and takes the shot with the most expected hits over the look-ahead.
+
+    A position is the misses, hits on ships still afloat, sunk tiles and the lengths of the ships left. The chance of
+    a hit on each tile comes from counting ship placements: while hunting, the chance any ship left covers the tile,
+    and once there is a hit, the share of placements through the hits that also cover the tile. The search tries the
+    BRANCHING most likely tiles at each step and both outcomes of each. Whether a hit sinks a ship is not known ahead,
+    so look-ahead hits stay hits. Values of positions are kept in a transposition table keyed by the position under
+    the board's rotations and reflections along with the board size, branching and depth, shared between games."""
+
+    def __init__(self, player_board, depth=SEARCH_DEPTH, branching=BRANCHING, table: TranspositionTable = None) -> None:
+        self.name = "ExpectimaxAI"
+        self.board_width = player_board.board_width
+        self.depth = depth
+        self.branching = branching
+        self.table = shared_table if table is None else table
+        self.placement_index = get_placement_index(self.board_width)
+        self.symmetries = symmetry_bits(self.board_width)
+        self.ship_lengths = {ship[0]: len(ship) for ship in player_board.SHIP_ART}
+        self.remaining_lengths = sorted(self.ship_lengths.values())
+        self.miss_mask = 0
+        self.active_hit_mask = 0
+        self.sunk_mask = 0
+        self.unshot_cells = CellPool(range(self.board_width * self.board_width))
+        self.last_cell = None
+
+    @staticmethod
+    def shard_statistics() -> TableStatistics:
+        """Statistics of the table shared in this process, which play_shard adds to the totals of each shard"""
+        return shared_table.statistics()
+
+    def get_AI_action(self, hit, sunk: list, shipTile) -> tuple[int, int]:
+        """Returns x,y coordinate of the AI's shot"""
+        if self.last_cell is not None:
+            self.record_shot(self.last_cell, hit, sunk, shipTile)
+        position = (self.miss_mask, self.active_hit_mask, self.sunk_mask, tuple(self.remaining_lengths))
+        probabilities = self.hit_probabilities(position)
+        best_value = -1
+        best_cells = []
+        for cell in self.candidates(position, probabilities):
+            value = self.shot_value(position, cell, probabilities[cell], self.depth)
+            if value > best_value + 1e-12:
+                best_value = value
+                best_cells = [cell]
+            elif value > best_value - 1e-12:
+                best_cells.append(cell)
+        cell = random.choice(best_cells) if best_cells else self.unshot_cells.random_cell()
+        self.unshot_cells.discard(cell)
+        self.last_cell = cell
+        return divmod(cell, self.board_width)
+
+    def record_shot(self, cell, hit, sunk, ship_tile):
+        bit = 1 << cell
+        if not hit:
+            self.miss_mask |= bit
+        elif not sunk:
+            self.active_hit_mask |= bit
+        else:
+            ship_mask = self.placement_index.positions_to_mask(sunk)
+            self.sunk_mask |= ship_mask
+            self.active_hit_mask &= ~ship_mask
+            self.remaining_lengths.remove(self.ship_lengths[ship_tile])
+
+    def shot_value(self, position, cell, probability, depth) -> float:
+        """Expected hits from shooting cell and then playing the best shots for depth - 1 more turns"""
+        miss_mask, hit_mask, sunk_mask, lengths = position
+        bit = 1 << cell
+        return (probability * (1 + self.value((miss_mask, hit_mask | bit, sunk_mask, lengths), depth - 1))
+                + (1 - probability) * self.value((miss_mask | bit, hit_mask, sunk_mask, lengths), depth - 1))
+
+    def value(self, position, depth) -> float:
+        """Most expected hits over the next depth shots from position"""
+        if depth == 0 or not position[3]:
+            return 0.0
+        # Values depend on the board size and branching too, and AIs of any configuration can share a table
+        key = self.canonical_key(position) + (self.board_width, self.branching, depth)
+        value = self.table.get(key)
+        if value is None:
+            probabilities = self.hit_probabilities(position)
+            value = max((self.shot_value(position, cell, probabilities[cell], depth)
+                         for cell in self.candidates(position, probabilities)), default=0.0)
+            self.table.put(key, value)
+        return value
+
+    def candidates(self, position, probabilities) -> list[int]:
+        """The BRANCHING unshot tiles most likely to be hits"""
+        miss_mask, hit_mask, sunk_mask, lengths = position
+        shot_mask = miss_mask | hit_mask | sunk_mask
+        cells = [cell for cell in range(len(probabilities)) if probabilities[cell] > 0 and not shot_mask >> cell & 1]
+        cells.sort(key=probabilities.__getitem__, reverse=True)
+        return cells[:self.branching]
+
+    def hit_probabilities(self, position) -> list[float]:
+        """Estimated chance of a hit on every tile of position"""
+        miss_mask, hit_mask, sunk_mask, lengths = position
+        blocked = miss_mask | sunk_mask
+        cell_count = self.board_width * self.board_width
+        if hit_mask:
+            # Target the ship through the hits: the share of placements through a hit that also cover each tile
+            counts = [0] * cell_count
+            total = 0
+            hit_cells = [cell for cell in range(cell_count) if hit_mask >> cell & 1]
+            for length in lengths:
+                masks = self.placement_index.get_placements(length)
+                covering = self.placement_index.get_covering(length)
+                placement_cells = self.placement_index.get_cells(length)
+                for placement_id in {placement_id for cell in hit_cells for placement_id in covering[cell]}:
+                    if not masks[placement_id][0] & blocked:
+                        total += 1
+                        for cell in placement_cells[placement_id]:
+                            counts[cell] += 1
+            return [count / total if total else 0.0 for count in counts]
+        # Hunting: the chance at least one of the ships left covers the tile, each ship placed independently
+        miss_chances = [1.0] * cell_count
+        for length in lengths:
+            counts = [0] * cell_count
+            total = 0
+            masks = self.placement_index.get_placements(length)
+            for placement_id, cells in enumerate(self.placement_index.get_cells(length)):
+                if not masks[placement_id][0] & blocked:
+                    total += 1
+                    for cell in cells:
+                        counts[cell] += 1
+            if total:
+                for cell in range(cell_count):
+                    miss_chances[cell] *= 1 - counts[cell] / total
+        return [1 - miss_chance for miss_chance in miss_chances]
+
+    def canonical_key(self, position) -> tuple:
+        """Returns the same key for a position and its rotations and reflections"""
+        miss_mask, hit_mask, sunk_mask, lengths = position
+        keys = []
+        for table in self.symmetries:
+            key = []
+            for mask in (miss_mask, hit_mask, sunk_mask):
+                moved = 0
+                while mask:
+                    lowest_bit = mask & -mask
+                    mask ^= lowest_bit
+                    moved |= table[lowest_bit.bit_length() - 1]
+                key.append(moved)
+            keys.append(tuple(key))
+        return min(keys) + (lengths,)
+
+
+if __name__ == '__main__':
+    from text_battleship_ai_analysis import main
+    # The summary ends with the transposition tables of every worker
+    main(ExpectimaxAI, 1000, False, 100)
@@ -0,0 +1,62 @@
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from battleship_batch import BATCH_GAMES, random_fleets
+from battleship_records import CORPUS_HEADER, FleetCorpus, corpus_header
+from text_battleship_ai_analysis import BOARD_SIZE, Board
+
+CORPUS_FLEETS = 1_000_000
+
+
+def fleet_codes(ship_ids: np.ndarray, ship_art: list[str], size: int) -> np.ndarray:
+    """Returns a (games, ships) array of the byte coding each ship of the fleets in ship_ids, a (games, size * size)
+    array of ship indexes as random_fleets returns. A ship's first tile is its lowest cell id, and it runs along y if
+    the next cell id is the same ship."""
+    codes = np.empty((len(ship_ids), len(ship_art)), np.uint8)
+    rows = np.arange(len(ship_ids))
+    for ship_index, ship in enumerate(ship_art):
+        is_ship = ship_ids == ship_index
+        first_cells = is_ship.argmax(axis=1)
+        along_y = is_ship[rows, np.minimum(first_cells + 1, size * size - 1)] if len(ship) > 1 else False
+        codes[:, ship_index] = first_cells * 2 + along_y
+    return codes
+
+
+def write_corpus(path, fleets=CORPUS_FLEETS, ship_art: list[str] = None, size=BOARD_SIZE, seed=None, uniform=False,
+                 batch_fleets=BATCH_GAMES):
+    """Writes fleets random fleets to a fleet corpus file at path, batch_fleets at a time. Fleets follow the same
+    distribution as Board.auto_place_ships, or with uniform every valid fleet is equally likely"""
+    if ship_art is None:
+        ship_art = Board(size).SHIP_ART
+    rng = np.random.default_rng(seed)
+    with open(path, "wb") as file:
+        file.write(corpus_header(size, ship_art))
+        for first_fleet in range(0, fleets, batch_fleets):
+            ship_ids = random_fleets(min(batch_fleets, fleets - first_fleet), ship_art, size, rng, uniform)
+            file.write(fleet_codes(ship_ids, ship_art, size).tobytes())
+
+
+def corpus_array(path, start=0, stop=None) -> np.ndarray:
+    """Returns fleets start to stop of a corpus as a read only (fleets, ships) array of codes mapped from the file.
+    stop is clamped to the end of the corpus like a slice, and a start past stop raises ValueError"""
+    with FleetCorpus(path) as corpus:
+        ship_count = corpus.ship_count
+        fleets = len(corpus)
+    stop = fleets if stop is None else min(stop, fleets)
+    if not 0 <= start <= stop:
+        raise ValueError(f"{path} has no fleets {start} to {stop}, it holds {fleets}")
+    return np.memmap(path, np.uint8, "r", CORPUS_HEADER.size + ship_count * (start + 1), (stop - start, ship_count))
+
+
+def main(path="fleets.bsfc", fleets=CORPUS_FLEETS, seed=None, uniform=False):
+    start = perf_counter()
+    write_corpus(path, fleets, seed=seed, uniform=uniform)
+    seconds = perf_counter() - start
+    print(f"Wrote {fleets} fleets to {path} in {seconds:.2f}s, {fleets / seconds:.0f} fleets/s")
+
+
+if __name__ == '__main__':
+    # python battleship_fleet_corpus.py [path] [fleets]
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
@@ -0,0 +1,132 @@
+import sys
+
+import numpy as np
+
+from battleship_records import HIT_BIT, RECORD_HEADER, read_records
+from text_battleship_ai_analysis import BOARD_SIZE, Board
+
+# Layers of a heatmap file, each a count per cell id. games is the same in every cell so heatmaps merge by adding.
+HEATMAP_LAYERS = ("games", "shots", "hits", "first_shot_turns", "first_shots")
+# Records read from a record file before they are added as one batch
+HEATMAP_BATCH = 4096
+
+
+class Heatmaps:
+    """Per cell counts over many games: how often each cell is shot and hit, and the turns it is first shot on.
+
+    Games are added as encoded game records (see battleship_records) a batch at a time. The shot bytes of a batch
+    are decoded and counted with NumPy, so the cost per shot is a few array operations shared by the whole batch."""
+
+    def __init__(self, size=BOARD_SIZE, counts: np.ndarray = None):
+        self.size = size
+        self.counts = np.zeros((len(HEATMAP_LAYERS), size * size), np.int64) if counts is None else counts
+
+    def add_records(self, records: list[bytes], ship_count: int):
+        """Adds a batch of encoded games"""
+        if not records:
+            return
+        shot_bytes = []
+        lengths = []
+        for record in records:
+            shots = RECORD_HEADER.unpack_from(record)[0]
+            first_shot = RECORD_HEADER.size + ship_count
+            shot_bytes.append(record[first_shot:first_shot + shots])
+            lengths.append(shots)
+        codes = np.frombuffer(b"".join(shot_bytes), np.uint8)
+        cells = (codes & (HIT_BIT - 1)).astype(np.int64)
+        cell_count = self.size * self.size
+        lengths = np.array(lengths)
+        game_starts = np.cumsum(lengths) - lengths
+        games = np.repeat(np.arange(len(records)), lengths)
+        turns = np.arange(len(codes)) - np.repeat(game_starts, lengths) + 1
+        # np.unique returns the first index of each (game, cell), which is the first time the game shot the cell
+        first_indexes = np.unique(games * cell_count + cells, return_index=True)[1]
+        first_cells = cells[first_indexes]
+        self.counts[0] += len(records)
+        self.counts[1] += np.bincount(cells, minlength=cell_count)
+        self.counts[2] += np.bincount(cells[codes >= HIT_BIT], minlength=cell_count)
+        self.counts[3] += np.bincount(first_cells, turns[first_indexes], cell_count).astype(np.int64)
+        self.counts[4] += np.bincount(first_cells, minlength=cell_count)
+
+    def merge(self, other: "Heatmaps"):
+        self.counts += other.counts
+
+    @property
+    def games(self) -> int:
+        return int(self.counts[0, 0])
+
+    def layer(self, name) -> np.ndarray:
+        """Returns one layer as a size by size grid indexed [x][y] like the boards"""
+        return self.counts[HEATMAP_LAYERS.index(name)].reshape(self.size, self.size)
+
+    def shot_percentages(self) -> np.ndarray:
+        """Percentage of games each cell was shot in"""
+        return self.layer("first_shots") / max(self.games, 1) * 100
+
+    def hit_percentages(self) -> np.ndarray:
+        """Percentage of games each cell was hit in, which is how often a ship was placed on it"""
+        return self.layer("hits") / max(self.games, 1) * 100
+
+    def first_shot_turns(self) -> np.ndarray:
+        """Average turn each cell was first shot on, over the games it was shot in"""
+        return self.layer("first_shot_turns") / np.maximum(self.layer("first_shots"), 1)
+
+    def save(self, path):
+        np.save(path, self.counts.reshape(len(HEATMAP_LAYERS), self.size, self.size))
+
+    def print_summary(self):
+        print(f"Heatmaps of {self.games} games")
+        print("Games each tile was shot in (%)")
+        print_heatmap(self.shot_percentages())
+        print("Games each tile had a ship (%)")
+        print_heatmap(self.hit_percentages())
+        print("Average turn each tile was first shot")
+        print_heatmap(self.first_shot_turns())
+
+
+def load_heatmaps(path) -> Heatmaps:
+    counts = np.load(path)
+    return Heatmaps(counts.shape[1], counts.reshape(len(HEATMAP_LAYERS), -1))
+
+
+def record_file_heatmaps(path, min_shots=0, max_shots=None) -> Heatmaps:
+    """Returns the heatmaps of the games in a game record file"""
+    heatmaps = None
+    batch = []
+    ship_count = None
+    for record in read_records(path, min_shots, max_shots):
+        if heatmaps is None:
+            heatmaps = Heatmaps(record.board_width)
+        if record.ship_count != ship_count and batch:
+            # A batch is decoded with one ship count, so a chunk of another fleet starts a new one
+            heatmaps.add_records(batch, ship_count)
+            batch = []
+        ship_count = record.ship_count
+        batch.append(record.data)
+        if len(batch) == HEATMAP_BATCH:
+            heatmaps.add_records(batch, ship_count)
+            batch = []
+    if heatmaps is None:
+        return Heatmaps()
+    heatmaps.add_records(batch, ship_count)
+    return heatmaps
+
+
+def print_heatmap(grid: np.ndarray):
+    """Prints a size by size grid indexed [x][y] in the layout of Board.print_board, each value rounded to fit a
+    tile"""
+    size = len(grid)
+    board = Board(size)
+    print("   " + "   ".join(str(x) for x in range(size)))
+    for y in range(size):
+        print(" " + "+---" * size + "+")
+        print(board.number_to_letter(y) + "".join(f"|{min(grid[x][y], 999):3.0f}" for x in range(size)) + "|")
+    print(" " + "+---" * size + "+")
+
+
+if __name__ == '__main__':
+    # Prints heatmaps saved by the analysis main, or made from a game record file
+    if sys.argv[1].endswith(".npy"):
+        load_heatmaps(sys.argv[1]).print_summary()
+    else:
+        record_file_heatmaps(sys.argv[1]).print_summary()
@@ -0,0 +1,93 @@
+import asyncio
+import random
+import sys
+from time import perf_counter
+
+from battleship_server import HOST, start_server
+from text_battleship_play import BOARD_SIZE, AIConditional, Board
+
+LOAD_CLIENTS = 1000
+LOAD_GAMES = 2
+
+
+async def play_client(host, port, games, latencies: list[float]) -> int:
+    """Plays games one after another over one connection each, shooting random tiles. Appends the time from sending
+    each shot to the server asking for the next one (which includes the AI's reply) to latencies and returns the
+    number of turns played"""
+    letters = Board(BOARD_SIZE).LETTER_TO_COORDINATE_MAP
+    turns = 0
+    for game in range(games):
+        reader, writer = await asyncio.open_connection(host, port)
+        cells = random.sample(range(BOARD_SIZE * BOARD_SIZE), BOARD_SIZE * BOARD_SIZE)
+        sent_at = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("Server closed the connection mid game")
+                message = line.split(b" ", 1)[0].strip()
+                if message in (b"TURN", b"WIN", b"LOSE") and sent_at is not None:
+                    latencies.append(perf_counter() - sent_at)
+                    sent_at = None
+                if message == b"PLACE":
+                    writer.write(b"AUTO\n")
+                elif message == b"TURN":
+                    x, y = divmod(cells.pop(), BOARD_SIZE)
+                    sent_at = perf_counter()
+                    writer.write(f"{x} {letters[y]}\n".encode())
+                    turns += 1
+                elif message in (b"WIN", b"LOSE"):
+                    break
+                elif message == b"ERROR":
+                    raise ValueError(f"Server rejected a command: {line.decode().strip()}")
+        finally:
+            writer.close()
+    return turns
+
+
+async def run_load(host, port, clients=LOAD_CLIENTS, games=LOAD_GAMES) -> (int, float, list[float]):
+    """Runs clients concurrent clients each playing games games. Returns the turns played, seconds taken and every
+    turn's latency"""
+    latencies = []
+    start = perf_counter()
+    turns = await asyncio.gather(*(play_client(host, port, games, latencies) for i in range(clients)))
+    return sum(turns), perf_counter() - start, latencies
+
+
+def print_load_report(clients, games, turns, seconds, latencies: list[float]):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{clients} clients played {clients * games} games, {turns} turns in {seconds:.2f}s")
+    print(f"Turns per second: {turns / seconds:.0f}")
+    print(f"Turn latency p50/p99/max: {p50 * 1000:.2f}/{p99 * 1000:.2f}/{latencies[-1] * 1000:.2f} ms")
+
+
+async def load_test(clients=LOAD_CLIENTS, games=LOAD_GAMES, host=None, port=None, AIClass=AIConditional):
+    """Runs the load against a server at host and port, or against a server started here on a free port if host is
+    None. A server started here shares this process with the clients, so its numbers include their cost too."""
+    listener = None
+    if host is None:
+        game_server, listener = await start_server(HOST, 0, AIClass)
+        host, port = HOST, listener.sockets[0].getsockname()[1]
+    try:
+        print_load_report(clients, games, *await run_load(host, port, clients, games))
+    finally:
+        if listener is not None:
+            listener.close()
+            await listener.wait_closed()
+            game_server.close()
+
+
+def main(clients=LOAD_CLIENTS, games=LOAD_GAMES, host=None, port=None, AIClass=AIConditional):
+    asyncio.run(load_test(clients, games, host, port, AIClass))
+
+
+if __name__ == '__main__':
+    # python battleship_load_generator.py [clients] [host port]
+    if len(sys.argv) > 2:
+        main(int(sys.argv[1]), host=sys.argv[2], port=int(sys.argv[3]))
+    elif len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main()
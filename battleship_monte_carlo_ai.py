@@ -0,0 +1,153 @@
+import random
+
+from battleship_placements import get_placement_index
+from text_battleship_ai_analysis import CellPool
+
+# Fleets kept each turn unless the AI is given another sample_budget
+SAMPLE_BUDGET = 200
+# Random placements tried for a ship before the fleet being built is given up
+PLACEMENT_ATTEMPTS = 20
+
+
+class MonteCarloAI:
+    """AI that samples complete enemy fleets that agree with everything seen so far and shoots the unshot tile
+    occupied in the most samples.
+
+    A sample is (fleet mask, placement id of each ship). Samples that still agree after a shot are kept to the next
+    turn and only the ones the shot ruled out are replaced, so most turns only build a few new fleets. counts holds
+    how many samples cover each tile and is updated as samples come and go."""
+
+    def __init__(self, player_board, sample_budget=SAMPLE_BUDGET) -> None:
+        self.name = "MonteCarloAI"
+        self.board_width = player_board.board_width
+        self.sample_budget = sample_budget
+        self.placement_index = get_placement_index(self.board_width)
+        self.ship_lengths = [len(ship) for ship in player_board.SHIP_ART]
+        self.ship_indexes = {ship[0]: i for i, ship in enumerate(player_board.SHIP_ART)}
+        self.placement_masks = {length: [mask for mask, positions in self.placement_index.get_placements(length)]
+                                for length in set(self.ship_lengths)}
+        self.miss_mask = 0
+        self.active_hit_mask = 0
+        self.sunk_mask = 0
+        # Placement id of each sunk ship, None while it is afloat
+        self.sunk_placements = [None] * len(self.ship_lengths)
+        self.unshot_cells = CellPool(range(self.board_width * self.board_width))
+        self.samples = []
+        self.counts = [0] * (self.board_width * self.board_width)
+        self.last_cell = None
+
+    def get_AI_action(self, hit, sunk: list, shipTile) -> tuple[int, int]:
+        """Returns x,y coordinate of the AI's shot"""
+        if self.last_cell is not None:
+            self.record_shot(self.last_cell, hit, sunk, shipTile)
+        self.fill_samples()
+        cell = self.choose_cell()
+        self.unshot_cells.discard(cell)
+        self.last_cell = cell
+        return divmod(cell, self.board_width)
+
+    def record_shot(self, cell, hit, sunk, ship_tile):
+        """Adds the result of the previous shot and drops the samples it rules out"""
+        bit = 1 << cell
+        if not hit:
+            self.miss_mask |= bit
+            self.remove_samples(lambda fleet_mask, placement_ids: fleet_mask & bit)
+        elif not sunk:
+            self.active_hit_mask |= bit
+            self.remove_samples(lambda fleet_mask, placement_ids: not fleet_mask & bit
+                                or self.has_unreported_sink(placement_ids))
+        else:
+            ship_index = self.ship_indexes[ship_tile]
+            ship_mask = self.placement_index.positions_to_mask(sunk)
+            placement_id = self.placement_masks[self.ship_lengths[ship_index]].index(ship_mask)
+            self.sunk_placements[ship_index] = placement_id
+            self.sunk_mask |= ship_mask
+            self.active_hit_mask &= ~ship_mask
+            self.remove_samples(lambda fleet_mask, placement_ids: placement_ids[ship_index] != placement_id)
+
+    def has_unreported_sink(self, placement_ids) -> bool:
+        """Returns True if a ship still afloat lies only on hit tiles. It would have been reported sunk, so a sample
+        placing it there contradicts the board."""
+        for i, (length, placement_id) in enumerate(zip(self.ship_lengths, placement_ids)):
+            if (self.sunk_placements[i] is None
+                    and not self.placement_masks[length][placement_id] & ~self.active_hit_mask):
+                return True
+        return False
+
+    def remove_samples(self, is_ruled_out):
+        kept = []
+        for sample in self.samples:
+            if is_ruled_out(*sample):
+                self.count_sample(sample, -1)
+            else:
+                kept.append(sample)
+        self.samples = kept
+
+    def count_sample(self, sample, change):
+        fleet_mask, placement_ids = sample
+        for length, placement_id in zip(self.ship_lengths, placement_ids):
+            for cell in self.placement_index.get_cells(length)[placement_id]:
+                self.counts[cell] += change
+
+    def fill_samples(self):
+        """Builds new samples until there are sample_budget of them. Gives up after a few times that many dead ends so
+        a turn with very tight constraints stays quick."""
+        attempts = 4 * self.sample_budget
+        while len(self.samples) < self.sample_budget and attempts:
+            attempts -= 1
+            sample = self.random_sample()
+            if sample:
+                self.samples.append(sample)
+                self.count_sample(sample, 1)
+
+    def random_sample(self):
+        """Returns a random (fleet mask, placement ids) that agrees with every shot so far, or None if the random
+        choices ran into a dead end. Hit tiles are covered first, then the other ships go anywhere still open."""
+        blocked = self.miss_mask | self.sunk_mask
+        fleet_mask = self.sunk_mask
+        placement_ids = list(self.sunk_placements)
+        unplaced = [i for i, placement_id in enumerate(placement_ids) if placement_id is None]
+        uncovered = self.active_hit_mask
+        while uncovered:
+            cell = (uncovered & -uncovered).bit_length() - 1
+            candidates = []
+            for i in unplaced:
+                masks = self.placement_masks[self.ship_lengths[i]]
+                for placement_id in self.placement_index.get_covering(self.ship_lengths[i])[cell]:
+                    if not masks[placement_id] & (blocked | fleet_mask):
+                        candidates.append((i, placement_id))
+            if not candidates:
+                return None
+            i, placement_id = random.choice(candidates)
+            mask = self.placement_masks[self.ship_lengths[i]][placement_id]
+            unplaced.remove(i)
+            placement_ids[i] = placement_id
+            fleet_mask |= mask
+            uncovered &= ~mask
+        random.shuffle(unplaced)
+        for i in unplaced:
+            masks = self.placement_masks[self.ship_lengths[i]]
+            for attempt in range(PLACEMENT_ATTEMPTS):
+                placement_id = random.randrange(len(masks))
+                if not masks[placement_id] & (blocked | fleet_mask):
+                    break
+            else:
+                return None
+            placement_ids[i] = placement_id
+            fleet_mask |= masks[placement_id]
+        if self.has_unreported_sink(placement_ids):
+            return None
+        return fleet_mask, tuple(placement_ids)
+
+    def choose_cell(self) -> int:
+        """Returns the unshot tile covered by the most samples, picking at random between ties"""
+        best_count = -1
+        best_cells = []
+        counts = self.counts
+        for cell in self.unshot_cells.cells:
+            if counts[cell] > best_count:
+                best_count = counts[cell]
+                best_cells = [cell]
+            elif counts[cell] == best_count:
+                best_cells.append(cell)
+        return random.choice(best_cells)
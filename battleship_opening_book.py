@@ -0,0 +1,96 @@
+import mmap
+import os
+import random
+import struct
+
+# File layout: a header, then capacity slots of (key, cell). A key of 0 marks an empty slot.
+# Header: magic, version, board size, plies covered, seed of the Zobrist keys, capacity (a power of 2), positions.
+BOOK_MAGIC = b"BSOB"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<4sBBHQQI")
+BOOK_SLOT = struct.Struct("<QH")
+
+# Books are opened once per process and shared by every AI that uses them.
+_OPEN_BOOKS = {}
+
+
+def zobrist_keys(size: int, seed: int) -> (int, list[tuple[int, int]]):
+    """Returns the key of the empty board and the (miss, hit) keys of each cell id. The key of a public board is the
+    empty board key XOR the key of every miss and hit on it."""
+    generator = random.Random(seed)
+    empty_key = generator.getrandbits(64) | 1
+    cell_keys = [(generator.getrandbits(64), generator.getrandbits(64)) for cell in range(size * size)]
+    return empty_key, cell_keys
+
+
+class OpeningBook:
+    """Read-only opening book memory mapped from a file built by battleship_opening_book_builder.
+
+    Maps the Zobrist key of a public board (misses and hits, no sunk ships) to the cell id to shoot next. The file is
+    an open addressing hash table, so a lookup unpacks a few slots straight from the mapping and nothing is loaded up
+    front."""
+
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < BOOK_HEADER.size:
+                raise ValueError(f"{path} is not a version {BOOK_VERSION} opening book")
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.board_width, self.plies, self.seed, self.capacity, self.positions = \
+            BOOK_HEADER.unpack_from(self.data)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            error = f"{path} is not a version {BOOK_VERSION} opening book"
+        elif self.capacity < 1 or self.capacity & (self.capacity - 1):
+            error = f"{path} has {self.capacity} slots, not a power of 2"
+        elif len(self.data) < BOOK_HEADER.size + self.capacity * BOOK_SLOT.size:
+            error = f"{path} is cut short, it holds fewer than its {self.capacity} slots"
+        else:
+            error = None
+        if error:
+            self.data.close()
+            raise ValueError(error)
+        self.empty_key, self.cell_keys = zobrist_keys(self.board_width, self.seed)
+
+    def check(self, board_width: int):
+        """Raises ValueError unless the book is for boards of board_width"""
+        if board_width != self.board_width:
+            raise ValueError(f"Opening book is for a {self.board_width} wide board, not {board_width}")
+
+    def next_key(self, key, cell, hit) -> int:
+        """Returns the key after a miss or hit on cell"""
+        return key ^ self.cell_keys[cell][1 if hit else 0]
+
+    def lookup(self, key) -> int | None:
+        """Returns the cell id the book plays from the position with this key, or None if it is out of book"""
+        mask = self.capacity - 1
+        slot = key & mask
+        while True:
+            stored_key, cell = BOOK_SLOT.unpack_from(self.data, BOOK_HEADER.size + slot * BOOK_SLOT.size)
+            if stored_key == key:
+                return cell
+            if not stored_key:
+                return None
+            slot = (slot + 1) & mask
+
+
+def open_book(path, board_width: int) -> OpeningBook:
+    """Returns the book at path, raising ValueError if it is not for boards of board_width"""
+    if path not in _OPEN_BOOKS:
+        _OPEN_BOOKS[path] = OpeningBook(path)
+    _OPEN_BOOKS[path].check(board_width)
+    return _OPEN_BOOKS[path]
+
+
+def write_book(path, board_width, plies, seed, moves: dict[int, int]):
+    """Writes moves, a dict of position key to cell id, as an opening book file with at most half its slots used"""
+    capacity = 1
+    while capacity < 2 * len(moves):
+        capacity *= 2
+    slots = [(0, 0)] * capacity
+    for key, cell in moves.items():
+        slot = key & (capacity - 1)
+        while slots[slot][0]:
+            slot = (slot + 1) & (capacity - 1)
+        slots[slot] = (key, cell)
+    with open(path, "wb") as file:
+        file.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, board_width, plies, seed, capacity, len(moves)))
+        file.write(b"".join(BOOK_SLOT.pack(key, cell) for key, cell in slots))
@@ -0,0 +1,38 @@
+import random
+
+from battleship_opening_book import write_book, zobrist_keys
+from battleship_probability_ai import ProbabilityDensityAI
+from text_battleship_ai_analysis import BOARD_SIZE, Board
+
+BOOK_PATH = "opening_book.bin"
+# Shots covered by the book. Every shot in book doubles the positions, 12 plies is about 4000 of them.
+BOOK_PLIES = 12
+BOOK_SEED = 1
+
+
+def build_book(path=BOOK_PATH, plies=BOOK_PLIES, seed=BOOK_SEED) -> int:
+    """Writes an opening book covering every sequence of hits and misses over the first plies shots and returns the
+    number of positions in it. Each position's move is the shot ProbabilityDensityAI would take from it."""
+    random.seed(seed)
+    empty_key, cell_keys = zobrist_keys(BOARD_SIZE, seed)
+    moves = {}
+    positions = [(empty_key, ProbabilityDensityAI(Board(BOARD_SIZE)))]
+    for ply in range(plies):
+        next_positions = []
+        for key, ai in positions:
+            # The same hits and misses reached in another order are the same position
+            if key in moves:
+                continue
+            cell = ai.choose_cell()
+            moves[key] = cell
+            for hit in (False, True):
+                child = ai.clone()
+                child.record_shot(cell, hit, [], "")
+                next_positions.append((key ^ cell_keys[cell][hit], child))
+        positions = next_positions
+    write_book(path, BOARD_SIZE, plies, seed, moves)
+    return len(moves)
+
+
+if __name__ == '__main__':
+    print(f"{build_book()} positions written to {BOOK_PATH}")
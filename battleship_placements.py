@@ -0,0 +1,186 @@
+import random
+
+# Indexes only depend on the board size, so one is built per size and shared by every board.
+_PLACEMENT_INDEXES = {}
+# Largest board an index is built for. An index holds every placement and the overlaps between them, which grows
+# with the square of the board's area, so bigger boards draw placements at random instead, see random_sparse_fleet.
+PLACEMENT_INDEX_MAX_SIZE = 16
+# Random placements tried for a ship, or with uniform draws of the whole fleet, before random_sparse_fleet gives up on
+# fitting it
+SPARSE_PLACEMENT_ATTEMPTS = 10000
+# Tiles generate_fleet gives ships, skipping the miss and hit tiles. Past these ships get other unicode characters.
+SHIP_TILES = "CBSDPAEFGHIJKLNOQRTUVWYZ"
+STANDARD_SHIP_NAMES = {"C": "CARRIER", "B": "BATTLESHIP", "D": "DESTROYER", "S": "SUBMARINE", "P": "PATROL BOAT"}
+
+
+class PlacementIndex:
+    """Every legal placement of a ship on an empty board, grouped by ship length.
+
+    A placement is (mask, positions). Bit x * size + y of mask is set for each [x, y] in positions, and positions are
+    in the same order Board.generate_ship_positions returns them. For each placement the index also keeps which
+    placements of every other length overlap it, so the placements still open to a ship are known without testing
+    any of them and a fleet is drawn without retries."""
+
+    def __init__(self, size: int):
+        self.board_width = size
+        self.placements = {}
+        self.cells = {}
+        self.covering = {}
+        # (length, placement id, other length) -> ids of the placements of other length that overlap it
+        self.conflicts = {}
+
+    def get_placements(self, length: int) -> list[tuple[int, list[list[int]]]]:
+        """Returns all (mask, positions) placements of a ship of this length, building them the first time"""
+        if length not in self.placements:
+            placements = []
+            for x in range(self.board_width):
+                for y in range(self.board_width):
+                    for orientation in ("H", "V"):
+                        if orientation == "H":
+                            positions = [[x + i, y] for i in range(length)]
+                        else:
+                            positions = [[x, y + i] for i in range(length)]
+                        if all(px < self.board_width and py < self.board_width for px, py in positions):
+                            placements.append((self.positions_to_mask(positions), positions))
+            self.placements[length] = placements
+        return self.placements[length]
+
+    def get_cells(self, length: int) -> list[list[int]]:
+        """Returns the cell ids x * size + y of every placement of this length, in the order of get_placements"""
+        if length not in self.cells:
+            self.cells[length] = [[x * self.board_width + y for x, y in positions]
+                                  for mask, positions in self.get_placements(length)]
+        return self.cells[length]
+
+    def get_covering(self, length: int) -> list[list[int]]:
+        """Returns, for every cell id, the ids of the placements of this length that cover it"""
+        if length not in self.covering:
+            covering = [[] for i in range(self.board_width * self.board_width)]
+            for placement_id, cells in enumerate(self.get_cells(length)):
+                for cell in cells:
+                    covering[cell].append(placement_id)
+            self.covering[length] = covering
+        return self.covering[length]
+
+    def positions_to_mask(self, positions) -> int:
+        mask = 0
+        for x, y in positions:
+            mask |= 1 << (x * self.board_width + y)
+        return mask
+
+    def get_conflicts(self, length: int, placement_id: int, other_length: int) -> frozenset[int]:
+        """Returns the ids of the placements of other_length that overlap placement placement_id of length"""
+        key = (length, placement_id, other_length)
+        if key not in self.conflicts:
+            # Build the whole table for this pair of lengths at once
+            others = self.get_placements(other_length)
+            for i, (mask, positions) in enumerate(self.get_placements(length)):
+                self.conflicts[(length, i, other_length)] = frozenset(
+                    j for j, (other_mask, other_positions) in enumerate(others) if mask & other_mask)
+        return self.conflicts[key]
+
+    def blocked_placements(self, length: int, placed: list[tuple[int, int]], occupied: int = 0) -> set[int]:
+        """Returns the ids of the placements of length that overlap the placed (length, id) ships or occupied tiles"""
+        blocked = set()
+        for placed_length, placed_id in placed:
+            blocked |= self.get_conflicts(placed_length, placed_id, length)
+        if occupied:
+            blocked.update(i for i, (mask, positions) in enumerate(self.get_placements(length)) if mask & occupied)
+        return blocked
+
+    def random_open_placement(self, length: int, blocked: set[int]) -> int:
+        """Returns the id of a placement drawn uniformly from those not in blocked"""
+        placement_id = random.randrange(len(self.get_placements(length)) - len(blocked))
+        # Step over every blocked id at or below the chosen rank to land on the rank-th open placement
+        for blocked_id in sorted(blocked):
+            if blocked_id > placement_id:
+                break
+            placement_id += 1
+        return placement_id
+
+    def random_fleet(self, ship_art: list[str], occupied: int = 0) -> list[list[list[int]]]:
+        """Returns positions for each ship, placing them one after another like Board.auto_place_ships always has.
+        Each ship is drawn uniformly from the placements left open by the ships before it."""
+        placed = []
+        fleet = []
+        for ship in ship_art:
+            length = len(ship)
+            placement_id = self.random_open_placement(length, self.blocked_placements(length, placed, occupied))
+            placed.append((length, placement_id))
+            fleet.append([position.copy() for position in self.get_placements(length)[placement_id][1]])
+        return fleet
+
+    def uniform_random_fleet(self, ship_art: list[str], occupied: int = 0) -> list[list[list[int]]]:
+        """Returns positions for each ship with every complete valid fleet equally likely.
+
+        Placing ships one after another favours fleets whose later ships had few open placements. Instead every ship
+        is drawn from all its placements and the whole fleet is redrawn if two ships overlap. About 2 in 5 fleets are
+        accepted on a 10x10 board with the standard ships."""
+        while True:
+            fleet_mask = occupied
+            fleet = []
+            for ship in ship_art:
+                mask, positions = random.choice(self.get_placements(len(ship)))
+                if mask & fleet_mask:
+                    break
+                fleet_mask |= mask
+                fleet.append(positions)
+            else:
+                return [[position.copy() for position in positions] for positions in fleet]
+
+
+def random_placement(size: int, length: int) -> list[list[int]]:
+    """Returns the positions of a placement drawn uniformly from every placement of a ship of length on an empty
+    board, like a random one of PlacementIndex.get_placements"""
+    if random.random() < 0.5:
+        x = random.randrange(size - length + 1)
+        y = random.randrange(size)
+        return [[x + i, y] for i in range(length)]
+    x = random.randrange(size)
+    y = random.randrange(size - length + 1)
+    return [[x, y + i] for i in range(length)]
+
+
+def random_sparse_fleet(size: int, ship_art: list[str], occupied_cells=frozenset(), uniform=False):
+    """Returns positions for each ship without a PlacementIndex, for boards too large to index.
+
+    Each ship is drawn from all its placements until one misses the ships before it and the occupied cell ids, which
+    gives the same fleets as PlacementIndex.random_fleet. With uniform any overlap redraws the whole fleet instead,
+    like uniform_random_fleet. A draw costs the ship's length whatever the size of the board, and while the ships
+    cover a small part of the board few draws overlap. Raises ValueError if a ship does not fit after
+    SPARSE_PLACEMENT_ATTEMPTS draws, or with uniform the fleet after as many redraws."""
+    for fleet_attempt in range(SPARSE_PLACEMENT_ATTEMPTS):
+        taken = set(occupied_cells)
+        fleet = []
+        for ship in ship_art:
+            for attempt in range(SPARSE_PLACEMENT_ATTEMPTS):
+                positions = random_placement(size, len(ship))
+                cells = [x * size + y for x, y in positions]
+                if taken.isdisjoint(cells) or uniform:
+                    break
+            else:
+                raise ValueError(f"Could not fit {ship} on the board")
+            if not taken.isdisjoint(cells):
+                break
+            taken.update(cells)
+            fleet.append(positions)
+        else:
+            return fleet
+    raise ValueError(f"Could not fit {ship} on the board")
+
+
+def generate_fleet(lengths: list[int]) -> list[str]:
+    """Returns the SHIP_ART of a fleet of ships of these lengths, each drawn with its own tile"""
+    tiles = SHIP_TILES + "".join(chr(code) for code in range(0x100, 0x100 + max(0, len(lengths) - len(SHIP_TILES))))
+    return [tile * length for tile, length in zip(tiles, lengths)]
+
+
+def ship_names(ship_art: list[str]) -> dict[str, str]:
+    """Returns SHIP_TILE_TO_NAME for a fleet, the standard ships keeping their names"""
+    return {ship[0]: STANDARD_SHIP_NAMES.get(ship[0], f"SHIP {i + 1}") for i, ship in enumerate(ship_art)}
+
+
+def get_placement_index(size: int) -> PlacementIndex:
+    if size not in _PLACEMENT_INDEXES:
+        _PLACEMENT_INDEXES[size] = PlacementIndex(size)
+    return _PLACEMENT_INDEXES[size]
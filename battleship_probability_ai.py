@@ -0,0 +1,161 @@
+import random
+
+import numpy as np
+
+from battleship_opening_book import open_book
+
+# Placement tables are the same for every board of a given size and fleet, so they are built once per process.
+_PLACEMENT_TABLES = {}
+
+
+class PlacementTable:
+    """Every placement of every ship in a fleet on an empty board.
+
+    Cell (x, y) is id x * size + y. row_cells[row] holds the cells of one placement, padded with the id size * size
+    for ships shorter than the longest one, so np.bincount over any set of rows gives per-cell counts in one call
+    (the last bin collects the padding). Rows of one ship are contiguous, ship_rows[ship] is their slice and
+    covering[cell] lists the rows that contain that cell."""
+
+    def __init__(self, size: int, ship_art: list[str]):
+        self.cell_count = size * size
+        longest = max(map(len, ship_art))
+        rows = []
+        self.ship_rows = {}
+        for ship in ship_art:
+            first_row = len(rows)
+            length = len(ship)
+            padding = [self.cell_count] * (longest - length)
+            for x in range(size):
+                for y in range(size):
+                    if x + length <= size:
+                        rows.append([(x + i) * size + y for i in range(length)] + padding)
+                    if y + length <= size:
+                        rows.append([x * size + y + i for i in range(length)] + padding)
+            self.ship_rows[ship[0]] = slice(first_row, len(rows))
+        self.row_cells = np.array(rows, dtype=np.intp)
+        self.lengths = (self.row_cells < self.cell_count).sum(axis=1)
+        self.covering = [np.flatnonzero((self.row_cells == cell).any(axis=1)) for cell in range(self.cell_count)]
+
+    def cell_counts(self, rows, weights=None) -> np.ndarray:
+        """Returns how many of the given placement rows cover each cell, plus the padding bin at the end"""
+        cells = self.row_cells[rows]
+        if weights is not None:
+            weights = np.repeat(weights, cells.shape[1])
+        return np.bincount(cells.ravel(), weights, minlength=self.cell_count + 1)
+
+
+def get_placement_table(size: int, ship_art: list[str]) -> PlacementTable:
+    key = (size, tuple(ship_art))
+    if key not in _PLACEMENT_TABLES:
+        _PLACEMENT_TABLES[key] = PlacementTable(size, ship_art)
+    return _PLACEMENT_TABLES[key]
+
+
+class ProbabilityDensityAI:
+    """AI that shoots the tile covered by the most possible placements of the ships that are still afloat.
+
+    Misses and sunk tiles rule placements out. While a ship is hit but not sunk only placements through the hit
+    tiles are counted, weighted by how many hit tiles they cover. The hunting counts are kept up to date after every
+    shot by subtracting the placements that shot ruled out.
+
+    Given the path of an opening book, it plays the book's moves until a ship sinks or the position is not in it."""
+
+    def __init__(self, player_board, book_path=None) -> None:
+        self.name = "ProbabilityDensityAI"
+        self.board_width = player_board.board_width
+        self.table = get_placement_table(self.board_width, player_board.SHIP_ART)
+        cell_count = self.table.cell_count
+        # Placements that do not cross a miss or a sunk tile and belong to a ship that is still afloat
+        self.alive = np.ones(len(self.table.row_cells), dtype=bool)
+        # Number of alive placements covering each tile. The extra last bin only collects padding.
+        self.counts = self.table.cell_counts(slice(None))
+        self.counts[cell_count] = 0
+        # Tiles hit on ships that are not sunk yet
+        self.active_hits = []
+        self.is_active_hit = np.zeros(cell_count + 1, dtype=bool)
+        # Random order between tiles of equal score, so ties are broken by a single argmax
+        self.tie_break = np.array(random.sample(range(cell_count + 1), cell_count + 1))
+        self.last_cell = None
+        self.book = open_book(book_path, player_board.board_width) if book_path else None
+        # Key of the position in the book, None once out of book
+        self.book_key = self.book.empty_key if self.book else None
+
+    def get_AI_action(self, hit, sunk: list, shipTile) -> tuple[int, int]:
+        """Returns x,y coordinate of the AI's shot"""
+        if self.last_cell is not None:
+            self.record_shot(self.last_cell, hit, sunk, shipTile)
+            if self.book_key is not None:
+                self.book_key = None if sunk else self.book.next_key(self.book_key, self.last_cell, hit)
+        cell = None
+        if self.book_key is not None:
+            cell = self.book.lookup(self.book_key)
+            if cell is None:
+                self.book_key = None
+        if cell is None:
+            cell = self.choose_cell()
+        self.last_cell = cell
+        return divmod(cell, self.board_width)
+
+    def clone(self) -> "ProbabilityDensityAI":
+        """Returns an independent copy sharing the placement table, e.g. to explore shots that have not happened"""
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.alive = self.alive.copy()
+        clone.counts = self.counts.copy()
+        clone.active_hits = self.active_hits.copy()
+        clone.is_active_hit = self.is_active_hit.copy()
+        return clone
+
+    def record_shot(self, cell, hit, sunk, ship_tile):
+        """Updates the counts with the result of the previous shot"""
+        if not hit:
+            self.rule_out_cell(cell)
+            return
+        self.active_hits.append(cell)
+        self.is_active_hit[cell] = True
+        if sunk:
+            # The sunk ship no longer needs a placement and its tiles are closed to every other ship
+            rows = self.table.ship_rows[ship_tile]
+            alive_rows = np.flatnonzero(self.alive[rows]) + rows.start
+            self.counts -= self.table.cell_counts(alive_rows)
+            self.alive[rows] = False
+            for x, y in sunk:
+                sunk_cell = x * self.board_width + y
+                self.active_hits.remove(sunk_cell)
+                self.is_active_hit[sunk_cell] = False
+                self.rule_out_cell(sunk_cell)
+
+    def rule_out_cell(self, cell):
+        """Removes every alive placement that covers cell"""
+        covering = self.table.covering[cell]
+        dead = covering[self.alive[covering]]
+        if len(dead):
+            self.alive[dead] = False
+            self.counts -= self.table.cell_counts(dead)
+
+    def choose_cell(self) -> int:
+        """Returns an unshot tile with the highest score, picking at random between ties"""
+        cell_count = self.table.cell_count
+        if not self.active_hits:
+            # Hunting. Misses and sunk tiles are covered by no alive placement so they can never be the best tile.
+            scores = self.counts
+        else:
+            # Only placements through a hit tile get a weight, so only those rows are looked at
+            if len(self.active_hits) == 1:
+                rows = self.table.covering[self.active_hits[0]]
+                rows = rows[self.alive[rows]]
+            else:
+                is_target_row = np.zeros(len(self.alive), dtype=bool)
+                for cell in self.active_hits:
+                    is_target_row[self.table.covering[cell]] = True
+                rows = np.flatnonzero(is_target_row & self.alive)
+            overlap = self.is_active_hit[self.table.row_cells[rows]].sum(axis=1)
+            # A placement made only of hit tiles would already be sunk
+            weights = np.where(overlap < self.table.lengths[rows], overlap, 0)
+            target_scores = self.table.cell_counts(rows, weights).astype(np.int64)
+            # Tiles next to the hits come first, the hunting counts break ties between them
+            scores = target_scores * (cell_count * len(self.table.row_cells)) + self.counts
+            scores[self.active_hits] = -1
+        scores = scores * (cell_count + 1) + self.tie_break
+        scores[cell_count] = -1
+        return int(scores.argmax())
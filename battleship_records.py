@@ -0,0 +1,289 @@
+import mmap
+import os
+import struct
+
+# A record is a header (number of shots, flags), one byte per ship in SHIP_ART order holding the cell id of its
+# first tile * 2 + 1 if it runs along y, then one byte per shot holding the cell id, + HIT_BIT if it hit.
+# If flags has TAGGED the shots are followed by one byte per shot, the index in MOVE_TYPES of the kind of move it was.
+RECORD_HEADER = struct.Struct("<HB")
+HIT_BIT = 0x80
+TAGGED = 0x01
+MOVE_TYPES = ("seek", "book", "attack", "flank")
+# Records are written in chunks. A chunk is a header (magic, board width, number of ships, games, bytes of records),
+# the length of each ship, then the records.
+CHUNK_MAGIC = b"BSGC"
+CHUNK_HEADER = struct.Struct("<4sBBII")
+# The index file next to the records has one entry per chunk: offset, games, bytes of records, fewest and most shots.
+INDEX_ENTRY = struct.Struct("<QIIHH")
+CHUNK_GAMES = 4096
+# A fleet corpus is a header (magic, board width, number of ships), the length of each ship, then fleets of one byte
+# per ship coded like the ships of a record, so every fleet takes the same number of bytes.
+CORPUS_MAGIC = b"BSFC"
+CORPUS_HEADER = struct.Struct("<4sBB")
+
+
+def index_path(path) -> str:
+    return path + ".idx"
+
+
+def record_size(shots: int, flags: int, ship_count: int) -> int:
+    """Returns the size of a record from its header"""
+    return RECORD_HEADER.size + ship_count + (2 * shots if flags & TAGGED else shots)
+
+
+def decode_fleet(codes, ship_art: list[str], board_width: int) -> list[list[list[int]]]:
+    """Returns the positions of each ship in ship_art from the byte coding each ship's first tile and orientation"""
+    fleet = []
+    for ship, code in zip(ship_art, codes):
+        x, y = divmod(code >> 1, board_width)
+        if code & 1:
+            fleet.append([[x, y + i] for i in range(len(ship))])
+        else:
+            fleet.append([[x + i, y] for i in range(len(ship))])
+    return fleet
+
+
+def encode_game(board, shots: list[tuple[int, bool]], move_types: list[str] = None) -> bytes:
+    """Returns the record of a game on board, where shots is every (cell id, hit) in the order they were taken.
+    move_types, the kind of move each shot was from MOVE_TYPES, is stored too if given"""
+    if board.board_width * board.board_width > HIT_BIT:
+        raise ValueError(f"Game records only fit boards of up to {HIT_BIT} tiles")
+    record = bytearray(RECORD_HEADER.pack(len(shots), 0 if move_types is None else TAGGED))
+    for ship in board.SHIP_ART:
+        positions = board.ship_positions[ship[0]]
+        x, y = positions[0]
+        along_y = len(positions) > 1 and positions[1][0] == x
+        record.append((x * board.board_width + y) * 2 + along_y)
+    record.extend(cell | HIT_BIT if hit else cell for cell, hit in shots)
+    if move_types is not None:
+        record.extend(map(MOVE_TYPES.index, move_types))
+    return bytes(record)
+
+
+class GameRecord:
+    """One recorded game, decoded from its bytes only when asked. ship_lengths is the length of each ship of its
+    fleet, as stored in the chunk it came from"""
+
+    def __init__(self, data, board_width: int, ship_lengths: list[int]):
+        self.data = data
+        self.board_width = board_width
+        self.ship_lengths = ship_lengths
+
+    @property
+    def ship_count(self) -> int:
+        return len(self.ship_lengths)
+
+    @property
+    def shot_count(self) -> int:
+        return RECORD_HEADER.unpack_from(self.data)[0]
+
+    def fleet(self, ship_art: list[str]) -> list[list[list[int]]]:
+        """Returns the positions of each ship in ship_art, raising ValueError if the record has other ships"""
+        if list(map(len, ship_art)) != self.ship_lengths:
+            raise ValueError(f"Record has ships of lengths {self.ship_lengths}, not {list(map(len, ship_art))}")
+        return decode_fleet(self.data[RECORD_HEADER.size:RECORD_HEADER.size + self.ship_count], ship_art,
+                            self.board_width)
+
+    def shots(self) -> list[tuple[int, int, bool]]:
+        """Returns every shot as (x, y, hit)"""
+        first_shot = RECORD_HEADER.size + self.ship_count
+        return [(*divmod(code & ~HIT_BIT, self.board_width), bool(code & HIT_BIT))
+                for code in self.data[first_shot:first_shot + self.shot_count]]
+
+    def move_types(self) -> list[str] | None:
+        """Returns the kind of move each shot was, or None if the record has no move types"""
+        if not RECORD_HEADER.unpack_from(self.data)[1] & TAGGED:
+            return None
+        first_tag = RECORD_HEADER.size + self.ship_count + self.shot_count
+        return [MOVE_TYPES[tag] for tag in self.data[first_tag:first_tag + self.shot_count]]
+
+
+class GameRecordWriter:
+    """Appends game records of fleets of ship_art to a file in chunks of chunk_games and indexes each chunk. Records
+    are only on disk once their chunk is flushed, which close does for the last one."""
+
+    def __init__(self, path, board_width: int, ship_art: list[str], chunk_games=CHUNK_GAMES):
+        self.path = path
+        self.board_width = board_width
+        self.ship_lengths = bytes(map(len, ship_art))
+        self.chunk_games = chunk_games
+        self.data_file = open(path, "ab")
+        self.index_file = open(index_path(path), "ab")
+        self.records = []
+        self.min_shots = None
+        self.max_shots = None
+
+    def add(self, record: bytes):
+        shots = RECORD_HEADER.unpack_from(record)[0]
+        self.min_shots = shots if self.min_shots is None else min(self.min_shots, shots)
+        self.max_shots = shots if self.max_shots is None else max(self.max_shots, shots)
+        self.records.append(record)
+        if len(self.records) >= self.chunk_games:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        payload = b"".join(self.records)
+        offset = self.data_file.seek(0, os.SEEK_END)
+        self.data_file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, self.board_width, len(self.ship_lengths),
+                                               len(self.records), len(payload)))
+        self.data_file.write(self.ship_lengths)
+        self.data_file.write(payload)
+        self.data_file.flush()
+        # The index entry goes last, so a chunk is never indexed before all of it is written
+        self.index_file.write(INDEX_ENTRY.pack(offset, len(self.records), len(payload), self.min_shots,
+                                               self.max_shots))
+        self.index_file.flush()
+        self.records = []
+        self.min_shots = None
+        self.max_shots = None
+
+    def close(self):
+        self.flush()
+        self.data_file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_index(path) -> list[tuple[int, int, int, int, int]]:
+    """Returns (offset, games, bytes of records, fewest shots, most shots) of every chunk"""
+    with open(index_path(path), "rb") as file:
+        return list(INDEX_ENTRY.iter_unpack(file.read()))
+
+
+def read_records(path, min_shots=0, max_shots=None):
+    """Yields every record with between min_shots and max_shots shots. Chunks the index shows hold no such game are
+    skipped without being read. Each record's fleet is read from its chunk's header."""
+    index = read_index(path)
+    if not index:
+        return
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for offset, games, payload_size, chunk_min_shots, chunk_max_shots in index:
+            if chunk_max_shots < min_shots or (max_shots is not None and chunk_min_shots > max_shots):
+                continue
+            magic, board_width, ship_count, games, payload_size = CHUNK_HEADER.unpack_from(data, offset)
+            if magic != CHUNK_MAGIC:
+                raise ValueError(f"{path} has no chunk at offset {offset}")
+            position = offset + CHUNK_HEADER.size + ship_count
+            ship_lengths = list(data[position - ship_count:position])
+            for i in range(games):
+                shots, flags = RECORD_HEADER.unpack_from(data, position)
+                size = record_size(shots, flags, ship_count)
+                if shots >= min_shots and (max_shots is None or shots <= max_shots):
+                    yield GameRecord(data[position:position + size], board_width, ship_lengths)
+                position += size
+
+
+def place_fleet(record: GameRecord, board):
+    """Places the recorded fleet on board, which must be empty"""
+    for ship, positions in zip(board.SHIP_ART, record.fleet(board.SHIP_ART)):
+        board.place_ship(ship, positions)
+
+
+def replay_turns(record: GameRecord, board):
+    """Places the recorded fleet on board and yields (x, y, hit, sunk, ship_tile, is_game_over) as each recorded shot
+    is fired at it"""
+    place_fleet(record, board)
+    for x, y, hit in record.shots():
+        yield (x, y) + board.shoot(x, y)
+
+
+def record_shots(record: GameRecord, ship_art: list[str]):
+    """Yields (ship tile or "" for a miss, sunk, move type or None) for each shot of the recorded game, the shot log
+    text_battleship_ai_analysis.GameAnalytics takes, worked out from the fleet without replaying on a board"""
+    ship_cells = {}
+    health = {}
+    for ship, positions in zip(ship_art, record.fleet(ship_art)):
+        health[ship[0]] = len(ship)
+        for x, y in positions:
+            ship_cells[x * record.board_width + y] = ship[0]
+    move_types = record.move_types() or [None] * record.shot_count
+    for (x, y, hit), move_type in zip(record.shots(), move_types):
+        # pop, so a second shot at a hit tile is a miss like on the board
+        ship_tile = ship_cells.pop(x * record.board_width + y, "")
+        if ship_tile:
+            health[ship_tile] -= 1
+        yield ship_tile, bool(ship_tile) and not health[ship_tile], move_type
+
+
+def replay(record: GameRecord, board, turns=None):
+    """Returns board as it was after the first turns shots of the recorded game, or at the end if turns is None"""
+    place_fleet(record, board)
+    for x, y, hit in record.shots()[:turns]:
+        board.shoot(x, y)
+    return board
+
+
+def corpus_header(board_width: int, ship_art: list[str]) -> bytes:
+    if board_width * board_width > HIT_BIT:
+        raise ValueError(f"Fleet corpora only fit boards of up to {HIT_BIT} tiles")
+    return CORPUS_HEADER.pack(CORPUS_MAGIC, board_width, len(ship_art)) + bytes(map(len, ship_art))
+
+
+class FleetCorpus:
+    """Fleets read from a fleet corpus file, e.g. one written by battleship_fleet_corpus.
+
+    The file is memory mapped and codes is a memoryview of the fleets in it, so opening a corpus reads only the
+    header and fleet i is read straight from the page cache at offset i * ship_count. Any process can open the same
+    file and read any range of fleets without loading the rest."""
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size < CORPUS_HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} is not a fleet corpus")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.board_width, self.ship_count = CORPUS_HEADER.unpack_from(self.data)
+        first_fleet = CORPUS_HEADER.size + self.ship_count
+        if magic != CORPUS_MAGIC:
+            error = f"{path} is not a fleet corpus"
+        elif not self.ship_count:
+            error = f"{path} has fleets of no ships"
+        elif len(self.data) < first_fleet + self.ship_count:
+            error = f"{path} holds no fleets"
+        else:
+            error = None
+        if error:
+            self.close()
+            raise ValueError(error)
+        self.ship_lengths = list(self.data[CORPUS_HEADER.size:first_fleet])
+        self.codes = memoryview(self.data)[first_fleet:]
+
+    def __len__(self):
+        return len(self.codes) // self.ship_count
+
+    def check(self, board_width: int, ship_art: list[str]):
+        """Raises ValueError unless the corpus holds fleets of ship_art on boards of board_width"""
+        if board_width != self.board_width or list(map(len, ship_art)) != self.ship_lengths:
+            raise ValueError(f"Corpus has ships of lengths {self.ship_lengths} on a {self.board_width} wide board")
+
+    def fleet_codes(self, index: int) -> memoryview:
+        return self.codes[index * self.ship_count:(index + 1) * self.ship_count]
+
+    def fleet(self, index: int, ship_art: list[str]) -> list[list[list[int]]]:
+        """Returns the positions of each ship in ship_art of fleet index"""
+        return decode_fleet(self.fleet_codes(index), ship_art, self.board_width)
+
+    def place_fleet(self, index: int, board):
+        """Places fleet index on board, which must be empty"""
+        for ship, positions in zip(board.SHIP_ART, self.fleet(index, board.SHIP_ART)):
+            board.place_ship(ship, positions)
+
+    def close(self):
+        # The views must go before the map, which refuses to close while they exist
+        if hasattr(self, "codes"):
+            self.codes.release()
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,90 @@
+from itertools import chain
+
+# Frame of each board size and row labels with a {} per tile, built once and filled in with str.format
+_FRAME_TEMPLATES = {}
+
+
+def row_labels(size: int) -> list[str]:
+    """Returns the letters labelling each row: A to Z, then AA, AB and so on like spreadsheet columns"""
+    labels = []
+    for n in range(1, size + 1):
+        label = ""
+        while n:
+            n, letter = divmod(n - 1, 26)
+            label = chr(ord("A") + letter) + label
+        labels.append(label)
+    return labels
+
+
+def tile_width(size: int) -> int:
+    """Returns the characters between the borders of a tile, 3 unless the column numbers need more"""
+    return max(3, len(str(size - 1)))
+
+
+def frame_template(size: int, labels: list[str]) -> str:
+    """Returns the layout of Board.print_board for a size by size board as one format string, tiles row by row"""
+    key = (size, tuple(labels[:size]))
+    if key not in _FRAME_TEMPLATES:
+        label_width = max(map(len, labels[:size]))
+        width = tile_width(size)
+        separator = " " * label_width + ("+" + "-" * width) * size + "+"
+        lines = [(" " * (label_width + 2) + "".join(f"{x:<{width + 1}}" for x in range(size))).rstrip()]
+        tile = "| {}" + " " * (width - 2)
+        for y in range(size):
+            lines.append(separator)
+            lines.append(labels[y].ljust(label_width) + tile * size + "|")
+        lines.append(separator)
+        _FRAME_TEMPLATES[key] = "\n".join(lines)
+    return _FRAME_TEMPLATES[key]
+
+
+def render_frame(grid: list[list[str]], labels: list[str]) -> str:
+    """Returns a grid indexed [x][y], like a board's private_board or public_board, laid out as print_board prints it"""
+    # zip(*grid) gives the rows of the frame, each tile y of every column x
+    return frame_template(len(grid), labels).format(*chain.from_iterable(zip(*grid)))
+
+
+class BoardView:
+    """A board drawn at a fixed place on an ANSI terminal, top being the screen line of its column numbers.
+
+    frame draws the whole board there. After that diff redraws only the tiles that changed, found from the board's
+    events (see Board.publish), so a turn costs a few escape sequences instead of a new frame."""
+
+    def __init__(self, board, showShips=False, top=1):
+        self.board = board
+        self.showShips = showShips
+        self.top = top
+        # Screen column of the tiles of column x is tile_step * x + tile_offset
+        self.tile_step = tile_width(board.board_width) + 1
+        self.tile_offset = 3 + max(map(len, board.LETTER_TO_COORDINATE_MAP[:board.board_width]))
+        self.changed_cells = set()
+        board.subscribe(self.on_board_change)
+
+    def on_board_change(self, change):
+        self.changed_cells.add(change[0])
+
+    def close(self):
+        self.board.unsubscribe(self.on_board_change)
+
+    def grid(self) -> list[list[str]]:
+        return self.board.private_board if self.showShips else self.board.public_board
+
+    def bottom(self) -> int:
+        """Screen line of the last line of the board"""
+        return self.top + 2 * self.board.board_width + 1
+
+    def frame(self) -> str:
+        self.changed_cells.clear()
+        return f"\033[{self.top};1H" + render_frame(self.grid(), self.board.LETTER_TO_COORDINATE_MAP)
+
+    def diff(self) -> str:
+        """Escape sequences redrawing the tiles changed since the last frame or diff, leaving the cursor where it was"""
+        if not self.changed_cells:
+            return ""
+        grid = self.grid()
+        updates = []
+        for cell in self.changed_cells:
+            x, y = divmod(cell, self.board.board_width)
+            updates.append(f"\033[{self.top + 2 + 2 * y};{self.tile_step * x + self.tile_offset}H{grid[x][y]}")
+        self.changed_cells.clear()
+        return "\0337" + "".join(updates) + "\0338"
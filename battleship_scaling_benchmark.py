@@ -0,0 +1,101 @@
+import random
+import tracemalloc
+from time import perf_counter
+
+from battleship_placements import generate_fleet
+from battleship_sparse_board import SparseBoard
+from text_battleship_ai_analysis import BOARD_SIZE, AIConditional, BaselineAI, Board
+
+SCALING_SEED = 2024
+SCALING_SIZES = (10, 32, 100, 316, 1000)
+
+
+def scaled_fleet(size: int) -> list[str]:
+    """Returns the standard fleet repeated once per 10 columns of the board, each ship with its own tile"""
+    lengths = [len(ship) for ship in Board(BOARD_SIZE).SHIP_ART]
+    return generate_fleet(lengths * max(1, size // 10))
+
+
+def new_fleet(BoardClass, size: int, ship_art: list[str]):
+    board = BoardClass(size, ship_art)
+    board.auto_place_ships()
+    return board
+
+
+def play_out(ai, board) -> int:
+    """Lets the AI shoot until the board's fleet is sunk and returns the moves it took"""
+    hit, sunk, ship_tile, is_game_over = False, [], "", False
+    moves = 0
+    while not is_game_over:
+        x, y = ai.get_AI_action(hit, sunk, ship_tile)
+        hit, sunk, ship_tile, is_game_over = board.shoot(x, y)
+        moves += 1
+    return moves
+
+
+def play_scaled_game(AIClass, BoardClass, size: int, ship_art: list[str]) -> (float, int, float):
+    """Places a fleet and lets the AI sink it. Returns the seconds placing the fleet, the moves played and the seconds
+    the AI and the board took over the moves"""
+    start = perf_counter()
+    board = new_fleet(BoardClass, size, ship_art)
+    placed = perf_counter()
+    moves = play_out(AIClass(board), board)
+    return placed - start, moves, perf_counter() - placed
+
+
+def game_memory(AIClass, BoardClass, size: int, ship_art: list[str]) -> (int, int):
+    """Returns the bytes the board and AI hold before the first move and the most bytes allocated at once over the
+    game. tracemalloc slows the game down a lot, so this is a separate game from the timed ones."""
+    tracemalloc.start()
+    try:
+        board = new_fleet(BoardClass, size, ship_art)
+        ai = AIClass(board)
+        setup = tracemalloc.get_traced_memory()[0]
+        play_out(ai, board)
+        return setup, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def scaling_run(AIClass, BoardClass, size: int, games: int, seed=SCALING_SEED) -> dict:
+    """Plays games seeded by size and game, so every AI and board class is given the same fleets"""
+    ship_art = scaled_fleet(size)
+    placement_seconds = game_seconds = 0
+    moves = 0
+    for game in range(games):
+        random.seed(f"{seed}:{size}:{game}")
+        placement, game_moves, game_time = play_scaled_game(AIClass, BoardClass, size, ship_art)
+        placement_seconds += placement
+        moves += game_moves
+        game_seconds += game_time
+    random.seed(f"{seed}:{size}:0")
+    setup_bytes, peak_bytes = game_memory(AIClass, BoardClass, size, ship_art)
+    return {"size": size, "AI": AIClass(BoardClass(size, ship_art)).name, "board": BoardClass.__name__,
+            "ships": len(ship_art), "placement_ms": placement_seconds / games * 1000, "moves": moves / games,
+            "us_per_move": game_seconds / moves * 1e6, "game_s": (placement_seconds + game_seconds) / games,
+            "setup_MB": setup_bytes / 1e6, "peak_MB": peak_bytes / 1e6}
+
+
+def print_scaling_run(result: dict):
+    print(f"{result['size']:>5} {result['AI']:<14}{result['board']:<12}{result['ships']:>4} ships  "
+          f"place {result['placement_ms']:8.2f} ms  {result['moves']:>9.0f} moves  {result['us_per_move']:6.2f} us/move"
+          f"  {result['game_s']:8.3f} s/game  setup {result['setup_MB']:7.2f} MB  peak {result['peak_MB']:7.2f} MB")
+
+
+def main(sizes=SCALING_SIZES, games=1, AIClasses=(BaselineAI, AIConditional), BoardClasses=(Board, SparseBoard),
+         seed=SCALING_SEED) -> list[dict]:
+    """Plays games on boards of each size, with a fleet growing with the board, and prints the time and memory each
+    AI and board class takes per game. Time per move should stay flat as the board grows. A full game shoots most
+    of the board, so peak memory grows with the area on any board, while setup memory shows what each board class
+    holds before the first shot."""
+    results = []
+    for size in sizes:
+        for AIClass in AIClasses:
+            for BoardClass in BoardClasses:
+                results.append(scaling_run(AIClass, BoardClass, size, games, seed))
+                print_scaling_run(results[-1])
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from text_battleship_play import AI, BOARD_SIZE, PLAYER, AIConditional, Board, Game, IllegalMove
+
+HOST = "127.0.0.1"
+PORT = 8765
+# Processes playing the AI's turns, shared by every session. One core is left to the event loop, but there are always
+# at least two processes so one slow AI move leaves another free for the other sessions.
+AI_WORKERS = max(2, (os.cpu_count() or 1) - 1)
+
+PROTOCOL = """Line protocol, one command or message per line
+Server to client:
+    PLACE <ship codes left>   place a ship, e.g. PLACE C B S D P
+    TURN                      your turn to shoot
+    SHOT <number> <letter> <result>   result of your shot: MISS, HIT or SUNK <ship name>
+    AI <number> <letter> <result>     the AI's shot at your fleet
+    WIN / LOSE                the game is over
+    ERROR <message>           the last command was not valid, send another
+Client to server:
+    C 5 J H                   while placing: ship code, number, letter and orientation (H/V)
+    AUTO                      while placing: place the whole fleet at random instead
+    0 A                       on your turn: number then letter of the tile to shoot
+    SURRENDER                 give up the game"""
+
+
+def shot_result(board: Board, hit, sunk, ship_tile) -> str:
+    if sunk:
+        return "SUNK " + board.SHIP_TILE_TO_NAME[ship_tile]
+    return "HIT" if hit else "MISS"
+
+
+def play_turn(game: Game, action: tuple[int, int]) -> (Game, list):
+    """Runs in a worker: plays the player's shot at action and then the AI's turns until it is the player's turn
+    again. Returns the game, as a worker plays on its own copy, and the TurnResults"""
+    results = [game.step(action)]
+    while not game.is_over() and game.turn == AI:
+        results.append(game.step())
+    return game, results
+
+
+class GameServer:
+    """Hosts games of clients against an AI over the line protocol in PROTOCOL, one Game per connection.
+
+    Sessions are coroutines on one event loop, each holding its own Game. AIs are CPU bound, so threads would hold the
+    GIL the event loop needs. Instead every turn the game goes to whichever of the ai_workers processes is free,
+    which plays it and sends it back, about 0.2 ms of pickling a turn. A slow AI move only holds up the one process it
+    is on, and no session is tied to it. The AI class must be picklable, e.g. a class or a functools.partial of one."""
+
+    def __init__(self, AIClass=AIConditional, ai_workers=AI_WORKERS):
+        if ai_workers < 1:
+            raise ValueError(f"The server needs at least one AI worker process, not {ai_workers}")
+        self.AIClass = AIClass
+        self.workers = ProcessPoolExecutor(max_workers=ai_workers)
+        self.sessions = 0
+        self.games_played = 0
+
+    def close(self):
+        self.workers.shutdown(cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions += 1
+        try:
+            await self.play(reader, writer)
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def play(self, reader, writer):
+        player_board = Board(BOARD_SIZE)
+        ships_to_place_codes = list(player_board.SHIP_TILE_TO_NAME.keys())
+        while ships_to_place_codes:
+            await send(writer, "PLACE " + " ".join(ships_to_place_codes))
+            command = await read_command(reader)
+            if command == ["AUTO"]:
+                player_board = Board(BOARD_SIZE)
+                player_board.auto_place_ships()
+                break
+            if command == ["SURRENDER"]:
+                await send(writer, "LOSE")
+                return
+            is_valid_position, code, ship, ship_positions = player_board.manual_place_ships(command,
+                                                                                            ships_to_place_codes)
+            if is_valid_position:
+                player_board.place_ship(ship, ship_positions)
+                ships_to_place_codes.remove(code)
+            else:
+                await send(writer, "ERROR Ensure command is 4 items long, each item is valid and ship does not "
+                                   "overlap another ship")
+        loop = asyncio.get_running_loop()
+        game = await loop.run_in_executor(self.workers, Game, self.AIClass, player_board)
+        # The game is played on copies from the workers. Both fleets have the size and ships of player_board though,
+        # so it still converts coordinates and names ships for both.
+        winner = None
+        # Results of the last shots, sent along with the next TURN so each turn is one write to the socket
+        lines = []
+        while winner is None:
+            await send(writer, *lines, "TURN")
+            lines = []
+            command = await read_command(reader)
+            if command == ["SURRENDER"]:
+                winner = AI
+                break
+            if not player_board.is_valid_coordinate(command):
+                await send(writer, "ERROR Enter a number then a letter separated by space e.g 0 A")
+                continue
+            try:
+                game, results = await loop.run_in_executor(self.workers, play_turn, game,
+                                                           player_board.coordinate_to_cartesian(command))
+            except IllegalMove as error:
+                await send(writer, f"ERROR {error}")
+                continue
+            winner = game.winner
+            for result in results:
+                lines.append(f"{'SHOT' if result.shooter == PLAYER else 'AI'} {result.x} "
+                             f"{player_board.number_to_letter(result.y)} "
+                             f"{shot_result(player_board, result.hit, result.sunk, result.ship_tile)}")
+        self.games_played += 1
+        await send(writer, *lines, "WIN" if winner == PLAYER else "LOSE")
+
+
+async def send(writer: asyncio.StreamWriter, *lines: str):
+    writer.write("".join(line + "\n" for line in lines).encode())
+    await writer.drain()
+
+
+async def read_command(reader: asyncio.StreamReader) -> list[str]:
+    """Returns the next line from the client split like the terminal's input, raising ConnectionError at the end or
+    for a line longer than the stream's limit"""
+    try:
+        line = await reader.readline()
+    except ValueError as error:
+        raise ConnectionAbortedError(f"Client sent too long a line: {error}")
+    if not line:
+        raise ConnectionResetError("Client disconnected")
+    return line.decode(errors="replace").strip().upper().split(" ")
+
+
+async def start_server(host=HOST, port=PORT, AIClass=AIConditional, ai_workers=AI_WORKERS):
+    """Starts a GameServer listening on host and port, port 0 picks a free one. Returns the server and the
+    asyncio server listening for it"""
+    game_server = GameServer(AIClass, ai_workers)
+    listener = await asyncio.start_server(game_server.handle, host, port, backlog=4096)
+    return game_server, listener
+
+
+async def serve_forever(host=HOST, port=PORT, AIClass=AIConditional, ai_workers=AI_WORKERS):
+    game_server, listener = await start_server(host, port, AIClass, ai_workers)
+    print(f"Serving battleships on {host}:{listener.sockets[0].getsockname()[1]}")
+    print(PROTOCOL)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        game_server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(serve_forever())
@@ -0,0 +1,89 @@
+from text_battleship_ai_analysis import Board
+
+
+class SparseColumn:
+    """Column x of a sparse grid, indexed by y like a column of Board.private_board. Only tiles that differ from the
+    default tile are stored, so a column of water costs nothing however long it is."""
+    __slots__ = ("tiles", "size", "default")
+
+    def __init__(self, size: int, default: str, tiles: dict = None):
+        # Tile at each y that is not the default
+        self.tiles = {} if tiles is None else tiles
+        self.size = size
+        self.default = default
+
+    def __getitem__(self, y):
+        return self.tiles.get(y, self.default)
+
+    def __setitem__(self, y, tile):
+        if tile == self.default:
+            self.tiles.pop(y, None)
+        else:
+            self.tiles[y] = tile
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        tiles = self.tiles
+        default = self.default
+        for y in range(self.size):
+            yield tiles.get(y, default)
+
+    def copy(self) -> "SparseColumn":
+        return SparseColumn(self.size, self.default, self.tiles.copy())
+
+
+def sparse_grid(size: int, default: str) -> list[SparseColumn]:
+    """Returns a size by size grid of the default tile indexed [x][y], storing only the tiles that are changed"""
+    return [SparseColumn(size, default) for x in range(size)]
+
+
+class SparseBoard(Board):
+    """Board whose private and public boards store only the tiles that are not water.
+
+    A dense board of size n holds n * n strings per grid, 16 MB for two grids of 1000x1000, and clone and snapshot
+    copy all of them. A sparse board holds an empty column per x plus the ships and shots, so memory, clone and
+    snapshot grow with what has happened in the game rather than the area. Tiles are read and written as board[x][y]
+    like a dense board, so the AIs and print_board work unchanged."""
+
+    def initialise_board(self, size):
+        """Creates a size by size board containing only water"""
+        self.private_board = sparse_grid(size, self.WATER_TILE)
+        self.public_board = sparse_grid(size, self.WATER_TILE)
+
+    def is_water_tile(self, x, y):
+        return y not in self.private_board[x].tiles
+
+    def shot_cells(self) -> list[int]:
+        """Returns the cell ids of every tile of the public board that is not water"""
+        board_width = self.board_width
+        return [x * board_width + y for x, column in enumerate(self.public_board) for y in column.tiles]
+
+    def snapshot(self) -> tuple:
+        """Returns the game state packed into an immutable tuple for restore, storing only tiles that are not water"""
+        return (tuple(tuple(column.tiles.items()) for column in self.private_board),
+                tuple(tuple(column.tiles.items()) for column in self.public_board),
+                tuple(self.ship_positions.items()),
+                tuple(self.ship_health_bars.items()),
+                self.remaining_health)
+
+    def restore(self, snapshot: tuple):
+        """Puts the board back to the state of a snapshot, publishing every tile of the public board that changes.
+        The undo journal, if enabled, is cleared."""
+        private_columns, public_columns, ship_positions, ship_health_bars, self.remaining_health = snapshot
+        for x, (private_tiles, public_tiles) in enumerate(zip(private_columns, public_columns)):
+            self.private_board[x].tiles = dict(private_tiles)
+            column = self.public_board[x]
+            old_tiles = column.tiles
+            column.tiles = dict(public_tiles)
+            if self.subscribers:
+                for y in old_tiles.keys() | column.tiles.keys():
+                    old_tile = old_tiles.get(y, self.WATER_TILE)
+                    new_tile = column[y]
+                    if old_tile != new_tile:
+                        self.publish(x, y, old_tile, new_tile)
+        self.ship_positions = dict(ship_positions)
+        self.ship_health_bars = dict(ship_health_bars)
+        if self.undo_journal is not None:
+            self.undo_journal = []
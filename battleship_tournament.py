@@ -0,0 +1,208 @@
+import os
+import random
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from statistics import NormalDist
+
+import numpy as np
+
+from text_battleship_ai_analysis import BOARD_SIZE, Board, BaselineAI, AIConditional
+
+# Matches of one pairing played by each process in a parallel tournament
+MATCH_SHARD = 500
+BASE_RATING = 1500
+BOOTSTRAP_SAMPLES = 1000
+# Virtual win given to each side of every pairing, so an AI that won every match still gets a finite rating
+RATING_PRIOR_WINS = 0.5
+
+
+def play_match(FirstAIClass, SecondAIClass, BoardClass=Board, uniform_fleets=False) -> (int, int):
+    """Plays one match between two AIs taking turns to shoot at each other's fleet, the first AI shooting first.
+    Returns 0 if the first AI won, 1 if the second did, and the number of turns played"""
+    boards = [BoardClass(BOARD_SIZE), BoardClass(BOARD_SIZE)]
+    for board in boards:
+        board.auto_place_ships(uniform_fleets)
+    # Each AI is given the board it shoots at, which is the other player's fleet
+    AIs = [FirstAIClass(boards[1]), SecondAIClass(boards[0])]
+    last_results = [(False, [], ""), (False, [], "")]
+    turns = 0
+    while True:
+        player = turns % 2
+        x, y = AIs[player].get_AI_action(*last_results[player])
+        hit, sunk, ship_tile, is_game_over = boards[1 - player].shoot(x, y)
+        last_results[player] = (hit, sunk, ship_tile)
+        turns += 1
+        if is_game_over:
+            return player, turns
+
+
+class TournamentResults:
+    """Win counts of a tournament. Results of separate shards can be merged into one"""
+
+    def __init__(self, player_count: int):
+        # wins[i][j] is the number of matches player i won against player j
+        self.wins = [[0] * player_count for i in range(player_count)]
+        self.matches = 0
+        self.first_mover_wins = 0
+        self.turns = 0
+
+    def add_match(self, first, second, winner_index, turns):
+        """Adds a match between players first and second, first moving first. winner_index is as play_match"""
+        winner, loser = (first, second) if winner_index == 0 else (second, first)
+        self.wins[winner][loser] += 1
+        self.matches += 1
+        self.first_mover_wins += winner_index == 0
+        self.turns += turns
+
+    def merge(self, other: "TournamentResults"):
+        for row, other_row in zip(self.wins, other.wins):
+            for j, wins in enumerate(other_row):
+                row[j] += wins
+        self.matches += other.matches
+        self.first_mover_wins += other.first_mover_wins
+        self.turns += other.turns
+
+    def player_matches(self, player) -> int:
+        return sum(self.wins[player]) + sum(row[player] for row in self.wins)
+
+    def win_rate(self, player) -> float:
+        return sum(self.wins[player]) / self.player_matches(player)
+
+    def first_mover_rate(self) -> float:
+        return self.first_mover_wins / self.matches
+
+
+def fit_ratings(wins: np.ndarray, iterations=1000, tolerance=1e-9) -> np.ndarray:
+    """Returns Elo style ratings fitted to a matrix of wins with the Bradley-Terry model, averaging BASE_RATING.
+    A 400 point gap means the stronger player is expected to win 10 matches for each one it loses."""
+    played = (wins + wins.T) > 0
+    wins = wins + RATING_PRIOR_WINS * played
+    matches = wins + wins.T
+    total_wins = wins.sum(axis=1)
+    strengths = np.ones(len(wins))
+    # Minorization-maximization updates, which converge for any connected set of pairings
+    for i in range(iterations):
+        new_strengths = total_wins / (matches / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+        new_strengths /= np.exp(np.log(new_strengths).mean())
+        if np.abs(new_strengths - strengths).max() < tolerance:
+            strengths = new_strengths
+            break
+        strengths = new_strengths
+    return BASE_RATING + 400 * np.log10(strengths)
+
+
+def bootstrap_ratings(wins: np.ndarray, confidence=0.95, samples=BOOTSTRAP_SAMPLES, seed=None) -> np.ndarray:
+    """Returns the (low, high) confidence interval of each player's rating, from refitting the ratings to samples
+    tournaments where each pairing's wins are redrawn from its observed win rate"""
+    rng = np.random.default_rng(seed)
+    matches = np.triu(wins + wins.T, 1)
+    win_rates = np.divide(np.triu(wins, 1), matches, out=np.zeros(wins.shape), where=matches > 0)
+    ratings = []
+    for i in range(samples):
+        upper_wins = rng.binomial(matches.astype(np.int64), win_rates)
+        ratings.append(fit_ratings(upper_wins + (matches - upper_wins).T))
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(ratings, [tail, 100 - tail], axis=0).T
+
+
+def play_pairing_shard(players, first, second, first_match, matches, seed=None, BoardClass=Board,
+                       uniform_fleets=False) -> TournamentResults:
+    """Plays matches first_match to first_match + matches - 1 between players first and second, flipping a coin for
+    who moves first in each. Seeded like play_shard, so a shard plays the same matches whichever process runs it"""
+    if seed is not None:
+        random.seed(f"{seed}:{first}:{second}:{first_match}")
+    results = TournamentResults(len(players))
+    for i in range(matches):
+        if random.random() < 0.5:
+            mover, other = first, second
+        else:
+            mover, other = second, first
+        winner_index, turns = play_match(players[mover], players[other], BoardClass, uniform_fleets)
+        results.add_match(mover, other, winner_index, turns)
+    return results
+
+
+def split_pairings(player_count, matches_per_pairing, shard_matches=MATCH_SHARD) -> list[tuple[int, int, int, int]]:
+    """Splits a round robin into (first, second, first_match, matches) shards of at most shard_matches"""
+    return [(first, second, first_match, min(shard_matches, matches_per_pairing - first_match))
+            for first, second in combinations(range(player_count), 2)
+            for first_match in range(0, matches_per_pairing, shard_matches)]
+
+
+def play_tournament(players, matches_per_pairing=1000, workers=1, seed=None, BoardClass=Board,
+                    uniform_fleets=False) -> TournamentResults:
+    """Plays matches_per_pairing matches between every two players. With workers > 1 the shards are played by a pool
+    of processes, which must be able to pickle the players, e.g. classes or functools.partial of classes"""
+    results = TournamentResults(len(players))
+    shards = split_pairings(len(players), matches_per_pairing)
+    if workers == 1:
+        for shard in shards:
+            results.merge(play_pairing_shard(players, *shard, seed, BoardClass, uniform_fleets))
+        return results
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shard in shards:
+            pending.append(executor.submit(play_pairing_shard, players, *shard, seed, BoardClass, uniform_fleets))
+            if len(pending) == 2 * workers:
+                results.merge(pending.popleft().result())
+        while pending:
+            results.merge(pending.popleft().result())
+    return results
+
+
+def player_names(players) -> list[str]:
+    """Names of the players' AIs, numbered where the same AI plays more than once"""
+    names = [player(Board(BOARD_SIZE)).name for player in players]
+    return [f"{name} #{names[:i].count(name) + 1}" if names.count(name) > 1 else name
+            for i, name in enumerate(names)]
+
+
+def one_sided_pairings(wins: np.ndarray) -> np.ndarray:
+    """Returns which pairings were played and won by the same player every time. Every bootstrap sample redraws the
+    same wins for these, so their part of the ratings and intervals comes from RATING_PRIOR_WINS, not the matches"""
+    return ((wins + wins.T) > 0) & ((wins == 0) | (wins.T == 0))
+
+
+def print_standings(names, results: TournamentResults, confidence=0.95, seed=None):
+    wins = np.array(results.wins, dtype=float)
+    ratings = fit_ratings(wins)
+    intervals = bootstrap_ratings(wins, confidence, seed=seed)
+    one_sided = one_sided_pairings(wins)
+    print(f"Tournament of {results.matches} matches, {results.turns / results.matches:.1f} turns per match")
+    for player in np.argsort(-ratings):
+        low, high = intervals[player]
+        print(f"{names[player]}: rating {ratings[player]:.0f} ({confidence * 100:g}% CI {low:.0f} to {high:.0f})"
+              f"{' *' if one_sided[player].any() else ''}, won {results.win_rate(player) * 100:.1f}% of "
+              f"{results.player_matches(player)} matches")
+    for first, second in combinations(range(len(names)), 2):
+        matches = results.wins[first][second] + results.wins[second][first]
+        if matches:
+            print(f"{names[first]} vs {names[second]}: {names[first]} won "
+                  f"{results.wins[first][second] / matches * 100:.1f}% of {matches}"
+                  f"{' *' if one_sided[first][second] else ''}")
+    if one_sided.any():
+        print(f"* one player won every match of the pairing, so its rating gap and CI come from the "
+              f"{RATING_PRIOR_WINS:g} virtual wins each side is given rather than the matches. The true gap may be "
+              f"larger.")
+    rate = results.first_mover_rate()
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    half_width = z * (rate * (1 - rate) / results.matches) ** 0.5
+    print(f"First mover won {rate * 100:.1f}% of matches (+/- {half_width * 100:.1f}%)")
+
+
+def main(players, matches_per_pairing=1000, workers=1, seed=None, BoardClass=Board, uniform_fleets=False,
+         confidence=0.95):
+    """Plays a round robin tournament between players, AI classes following the get_AI_action protocol, and prints
+    the standings with ratings. The same seed gives the same results for any number of workers."""
+    if workers > 1 and seed is None:
+        # Forked workers start with a copy of the parent's RNG, so they always need their own seeds
+        seed = random.getrandbits(64)
+        print(f"seed {seed}")
+    results = play_tournament(players, matches_per_pairing, workers, seed, BoardClass, uniform_fleets)
+    print_standings(player_names(players), results, confidence, seed)
+    return results
+
+
+if __name__ == '__main__':
+    main([AIConditional, BaselineAI], 10_000, workers=os.cpu_count())
@@ -0,0 +1,78 @@
+import copy
+import pickle
+import random
+
+import pytest
+
+from battleship_bitboard import BitBoard
+from text_battleship_ai_analysis import BOARD_SIZE, AIConditional, Board
+
+
+def same_fleets(seed) -> (Board, BitBoard):
+    """Returns a Board with a seeded random fleet and a BitBoard with the same fleet"""
+    random.seed(seed)
+    board = Board(BOARD_SIZE)
+    board.auto_place_ships()
+    bit_board = BitBoard(BOARD_SIZE)
+    for ship in board.SHIP_ART:
+        bit_board.place_ship(ship, board.ship_positions[ship[0]])
+    return board, bit_board
+
+
+def assert_same_state(board: Board, bit_board: BitBoard):
+    assert bit_board.private_board == board.private_board
+    assert bit_board.public_board == board.public_board
+    assert bit_board.ship_health_bars == board.ship_health_bars
+    assert bit_board.remaining_health == board.remaining_health
+    assert bit_board.is_game_over() == board.is_game_over()
+    assert sorted(bit_board.shot_cells()) == sorted(board.shot_cells())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_shots_match_board(seed):
+    board, bit_board = same_fleets(seed)
+    # Every tile once and some twice, in a seeded order
+    cells = list(range(BOARD_SIZE * BOARD_SIZE)) + random.sample(range(BOARD_SIZE * BOARD_SIZE), 20)
+    random.shuffle(cells)
+    for turn, cell in enumerate(cells):
+        x, y = divmod(cell, BOARD_SIZE)
+        assert bit_board.shoot(x, y) == board.shoot(x, y)
+        if turn == 30:
+            # The grids are first built mid game, then kept in sync by every later shot
+            assert not bit_board.grids_built
+            assert_same_state(board, bit_board)
+    assert board.is_game_over()
+    assert_same_state(board, bit_board)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ai_plays_the_same_game(seed):
+    shots = {}
+    for board in same_fleets(seed):
+        random.seed(seed)
+        ai = AIConditional(board)
+        hit, sunk, ship_tile, is_game_over = False, [], "", False
+        shots[type(board)] = []
+        while not is_game_over:
+            x, y = ai.get_AI_action(hit, sunk, ship_tile)
+            hit, sunk, ship_tile, is_game_over = board.shoot(x, y)
+            shots[type(board)].append((x, y, hit, sunk, ship_tile))
+    assert shots[BitBoard] == shots[Board]
+
+
+@pytest.mark.parametrize("copier", [copy.deepcopy, lambda board: pickle.loads(pickle.dumps(board))])
+@pytest.mark.parametrize("build_grids", [False, True])
+def test_copies_play_on_like_board(copier, build_grids):
+    board, bit_board = same_fleets(7)
+    cells = random.sample(range(BOARD_SIZE * BOARD_SIZE), BOARD_SIZE * BOARD_SIZE)
+    for cell in cells[:40]:
+        board.shoot(*divmod(cell, BOARD_SIZE))
+        bit_board.shoot(*divmod(cell, BOARD_SIZE))
+    if build_grids:
+        assert bit_board.public_board == board.public_board
+    bit_copy = copier(bit_board)
+    for cell in cells[40:]:
+        assert bit_copy.shoot(*divmod(cell, BOARD_SIZE)) == board.shoot(*divmod(cell, BOARD_SIZE))
+    assert_same_state(board, bit_copy)
+    # The original is left as it was
+    assert len(bit_board.shot_cells()) == 40
@@ -0,0 +1,122 @@
+import copy
+import random
+
+import pytest
+
+import text_battleship_ai_analysis
+import text_battleship_play
+from battleship_bitboard import BitBoard
+
+BOARD_SIZE = 10
+BOARD_CLASSES = [text_battleship_ai_analysis.Board, text_battleship_play.Board, BitBoard]
+
+
+class PublicBoardMirror:
+    """Keeps a copy of a board's public board from the changes it publishes alone, checking each change starts from
+    the tile the mirror has"""
+
+    def __init__(self, board):
+        self.grid = copy.deepcopy(board.public_board)
+        board.subscribe(self.on_change)
+
+    def on_change(self, change):
+        cell, old_tile, new_tile, sunk_ship = change
+        x, y = divmod(cell, BOARD_SIZE)
+        assert self.grid[x][y] == old_tile
+        self.grid[x][y] = new_tile
+
+
+def placed_board(BoardClass, seed):
+    random.seed(seed)
+    board = BoardClass(BOARD_SIZE)
+    board.auto_place_ships()
+    return board
+
+
+def state(board) -> tuple:
+    return (copy.deepcopy(board.private_board), copy.deepcopy(board.public_board), dict(board.ship_health_bars),
+            board.remaining_health, copy.deepcopy(board.ship_positions), board.is_game_over())
+
+
+@pytest.mark.parametrize("BoardClass", BOARD_CLASSES)
+def test_undo_reverts_every_shot(BoardClass):
+    board = placed_board(BoardClass, 1)
+    mirror = PublicBoardMirror(board)
+    board.enable_undo()
+    cells = random.sample(range(BOARD_SIZE * BOARD_SIZE), BOARD_SIZE * BOARD_SIZE) + [0, 0]
+    states = []
+    for cell in cells:
+        states.append(state(board))
+        board.shoot(*divmod(cell, BOARD_SIZE))
+        assert mirror.grid == board.public_board
+    assert board.is_game_over()
+    while states:
+        board.undo_shoot()
+        assert state(board) == states.pop()
+        assert mirror.grid == board.public_board
+    assert board.undo_journal == []
+
+
+@pytest.mark.parametrize("BoardClass", BOARD_CLASSES)
+def test_undo_a_sinking_shot(BoardClass):
+    board = placed_board(BoardClass, 2)
+    mirror = PublicBoardMirror(board)
+    board.enable_undo()
+    positions = board.ship_positions["P"]
+    board.shoot(*positions[0])
+    before = state(board)
+    hit, sunk, ship_tile, is_game_over = board.shoot(*positions[1])
+    assert sorted(sunk) == sorted(positions) and ship_tile == "P"
+    board.undo_shoot()
+    assert state(board) == before
+    assert mirror.grid == board.public_board
+    # The ship sinks again the same way after the undo
+    assert board.shoot(*positions[1])[1] == sunk
+
+
+@pytest.mark.parametrize("BoardClass", BOARD_CLASSES)
+def test_restore_snapshot_is_exact(BoardClass):
+    board = placed_board(BoardClass, 3)
+    cells = random.sample(range(BOARD_SIZE * BOARD_SIZE), BOARD_SIZE * BOARD_SIZE)
+    for cell in cells[:50]:
+        board.shoot(*divmod(cell, BOARD_SIZE))
+    snapshot = board.snapshot()
+    before = state(board)
+    mirror = PublicBoardMirror(board)
+    results = [board.shoot(*divmod(cell, BOARD_SIZE)) for cell in cells[50:]]
+    assert board.is_game_over()
+    board.restore(snapshot)
+    assert state(board) == before
+    assert mirror.grid == board.public_board
+    # A snapshot can be restored again and the game replays the same way
+    assert [board.shoot(*divmod(cell, BOARD_SIZE)) for cell in cells[50:]] == results
+    board.restore(snapshot)
+    assert state(board) == before
+
+
+@pytest.mark.parametrize("BoardClass", BOARD_CLASSES)
+def test_restore_clears_undo_journal(BoardClass):
+    board = placed_board(BoardClass, 4)
+    snapshot = board.snapshot()
+    board.enable_undo()
+    board.shoot(0, 0)
+    board.restore(snapshot)
+    assert board.undo_journal == []
+
+
+@pytest.mark.parametrize("BoardClass", BOARD_CLASSES)
+def test_clone_is_independent(BoardClass):
+    board = placed_board(BoardClass, 5)
+    cells = random.sample(range(BOARD_SIZE * BOARD_SIZE), BOARD_SIZE * BOARD_SIZE)
+    for cell in cells[:30]:
+        board.shoot(*divmod(cell, BOARD_SIZE))
+    board.subscribe(lambda change: None)
+    board.enable_undo()
+    clone = board.clone()
+    assert state(clone) == state(board)
+    assert clone.subscribers == [] and clone.undo_journal is None
+    before = state(board)
+    for cell in cells[30:]:
+        clone.shoot(*divmod(cell, BOARD_SIZE))
+    assert clone.is_game_over()
+    assert state(board) == before
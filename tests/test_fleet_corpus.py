@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from battleship_batch import random_fleets
+from battleship_fleet_corpus import corpus_array, fleet_codes, write_corpus
+from battleship_records import FleetCorpus, corpus_header
+from text_battleship_ai_analysis import BOARD_SIZE, Board
+
+SHIP_ART = Board(BOARD_SIZE).SHIP_ART
+
+
+def ship_id_grid(board: Board) -> np.ndarray:
+    """Returns the index in SHIP_ART of the ship on each cell id of board, -1 for water, like random_fleets"""
+    grid = np.full(BOARD_SIZE * BOARD_SIZE, -1)
+    for ship_index, ship in enumerate(SHIP_ART):
+        for x, y in board.ship_positions[ship[0]]:
+            grid[x * BOARD_SIZE + y] = ship_index
+    return grid
+
+
+@pytest.mark.parametrize("uniform", [False, True])
+def test_write_then_read_matches_random_fleets(tmp_path, uniform):
+    path = str(tmp_path / "fleets.bsfc")
+    write_corpus(path, 500, seed=3, uniform=uniform)
+    ship_ids = random_fleets(500, SHIP_ART, BOARD_SIZE, np.random.default_rng(3), uniform)
+    with FleetCorpus(path) as corpus:
+        corpus.check(BOARD_SIZE, SHIP_ART)
+        assert len(corpus) == 500
+        for i in range(500):
+            board = Board(BOARD_SIZE)
+            corpus.place_fleet(i, board)
+            assert (ship_id_grid(board) == ship_ids[i]).all()
+    assert (corpus_array(path) == fleet_codes(ship_ids, SHIP_ART, BOARD_SIZE)).all()
+    assert (corpus_array(path, 100, 120) == fleet_codes(ship_ids, SHIP_ART, BOARD_SIZE)[100:120]).all()
+
+
+def test_batches_write_every_fleet(tmp_path):
+    path = str(tmp_path / "fleets.bsfc")
+    write_corpus(path, 250, seed=5, batch_fleets=100)
+    with FleetCorpus(path) as corpus:
+        assert len(corpus) == 250
+        fleets = [corpus.fleet(i, SHIP_ART) for i in range(len(corpus))]
+    assert fleets[-1] != fleets[0]
+
+
+def test_check_rejects_other_fleets(tmp_path):
+    path = str(tmp_path / "fleets.bsfc")
+    write_corpus(path, 10, seed=1)
+    with FleetCorpus(path) as corpus:
+        with pytest.raises(ValueError):
+            corpus.check(BOARD_SIZE, SHIP_ART[:-1])
+        with pytest.raises(ValueError):
+            corpus.check(8, SHIP_ART)
+
+
+@pytest.mark.parametrize("data", [b"", b"not a corpus", corpus_header(BOARD_SIZE, SHIP_ART),
+                                  corpus_header(BOARD_SIZE, []) + b"\x01\x02"])
+def test_rejects_files_without_fleets(tmp_path, data):
+    path = tmp_path / "fleets.bsfc"
+    path.write_bytes(data)
+    with pytest.raises(ValueError, match="fleets.bsfc"):
+        FleetCorpus(str(path))
+
+
+@pytest.mark.parametrize("start, stop", [(20, 10), (11, None), (-1, 5)])
+def test_corpus_array_rejects_ranges_outside_the_corpus(tmp_path, start, stop):
+    path = str(tmp_path / "fleets.bsfc")
+    write_corpus(path, 10, seed=2)
+    with pytest.raises(ValueError, match="fleets.bsfc"):
+        corpus_array(path, start, stop)
+    assert corpus_array(path, 8, 100).shape == (2, len(SHIP_ART))
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from text_battleship_play import AI, BOARD_SIZE, PLAYER, AIConditional, Board, Game, IllegalMove
+
+
+def placed_board(seed) -> Board:
+    random.seed(seed)
+    board = Board(BOARD_SIZE)
+    board.auto_place_ships()
+    return board
+
+
+def fleet_cells(board: Board) -> list[tuple[int, int]]:
+    return [tuple(position) for ship in board.SHIP_ART for position in board.ship_positions[ship[0]]]
+
+
+def test_turns_alternate_and_shots_are_kept():
+    game = Game(AIConditional, placed_board(1), placed_board(2))
+    assert game.turn == PLAYER
+    player_result = game.step((0, 3))
+    assert (player_result.shooter, player_result.x, player_result.y) == (PLAYER, 0, 3)
+    assert player_result.hit == ((0, 3) in fleet_cells(game.enemy_board))
+    assert game.turn == AI
+    AI_result = game.step()
+    assert AI_result.shooter == AI
+    assert game.player_board.public_board[AI_result.x][AI_result.y] != game.player_board.WATER_TILE
+    assert game.turn == PLAYER
+    assert game.shots[PLAYER] == [(3, player_result.hit)]
+    assert game.shots[AI] == [(AI_result.x * BOARD_SIZE + AI_result.y, AI_result.hit)]
+
+
+def test_ai_can_go_first():
+    game = Game(AIConditional, placed_board(1), placed_board(2), player_first=False)
+    assert game.turn == AI
+    assert game.step().shooter == AI
+    assert game.turn == PLAYER
+
+
+def test_player_sinking_the_fleet_wins():
+    game = Game(AIConditional, placed_board(3), placed_board(4))
+    targets = fleet_cells(game.enemy_board)
+    result = None
+    while not game.is_over():
+        if game.turn == PLAYER:
+            result = game.step(targets.pop())
+        else:
+            game.step()
+    assert game.winner == PLAYER
+    assert result.shooter == PLAYER and result.hit and result.sunk and result.is_game_over
+    assert game.enemy_board.is_game_over() and not game.player_board.is_game_over()
+    assert sum(hit for cell, hit in game.shots[PLAYER]) == len(fleet_cells(game.enemy_board))
+    with pytest.raises(IllegalMove, match="over"):
+        game.step((0, 0))
+    with pytest.raises(IllegalMove):
+        game.step()
+
+
+def test_ai_sinking_the_fleet_wins():
+    game = Game(AIConditional, placed_board(5), placed_board(6))
+    while not game.is_over():
+        # The player shoots the same tile every turn, so only the AI can win
+        game.step((0, 0) if game.turn == PLAYER else None)
+    assert game.winner == AI
+    assert game.player_board.is_game_over()
+    assert len(game.shots[AI]) == len(game.shots[PLAYER])
+
+
+@pytest.mark.parametrize("action", [None, (-1, 0), (0, BOARD_SIZE), (BOARD_SIZE, BOARD_SIZE)])
+def test_player_must_shoot_on_the_board(action):
+    game = Game(AIConditional, placed_board(7), placed_board(8))
+    with pytest.raises(IllegalMove):
+        game.step(action)
+    # A rejected shot leaves the turn with the player
+    assert game.turn == PLAYER and game.shots[PLAYER] == []
+    assert issubclass(IllegalMove, ValueError)
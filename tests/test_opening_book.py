@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from battleship_opening_book import BOOK_HEADER, OpeningBook, open_book, write_book, zobrist_keys
+from battleship_opening_book_builder import build_book
+from battleship_probability_ai import ProbabilityDensityAI
+from text_battleship_ai_analysis import BOARD_SIZE, AIConditional, Board
+
+
+def test_write_then_lookup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    # Keys 1, 17 and 33 share their low bits, so they probe past each other in the table
+    moves = {1: 5, 17: 6, 33: 7, 2: 99, 0xFFFFFFFFFFFFFFFF: 42}
+    write_book(path, BOARD_SIZE, 3, 9, moves)
+    book = OpeningBook(path)
+    assert (book.board_width, book.plies, book.seed, book.positions) == (BOARD_SIZE, 3, 9, len(moves))
+    assert book.capacity >= 2 * len(moves)
+    for key, cell in moves.items():
+        assert book.lookup(key) == cell
+    assert book.lookup(3) is None
+    assert book.lookup(49) is None
+
+
+def test_build_then_lookup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    positions = build_book(path, plies=3, seed=4)
+    book = OpeningBook(path)
+    assert book.positions == positions == 1 + 2 + 4
+    assert book.empty_key == zobrist_keys(BOARD_SIZE, 4)[0]
+
+    random.seed(4)
+    ai = ProbabilityDensityAI(Board(BOARD_SIZE))
+    first_cell = ai.choose_cell()
+    assert book.lookup(book.empty_key) == first_cell
+    for hit in (False, True):
+        child = ai.clone()
+        child.record_shot(first_cell, hit, [], "")
+        assert book.lookup(book.next_key(book.empty_key, first_cell, hit)) == child.choose_cell()
+    # A miss on a tile the book never shoots first leads out of book
+    other_cell = (first_cell + 1) % (BOARD_SIZE * BOARD_SIZE)
+    assert book.lookup(book.next_key(book.empty_key, other_cell, False)) is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        OpeningBook(str(path))
+
+
+@pytest.mark.parametrize("size", [0, 5, BOOK_HEADER.size, BOOK_HEADER.size + 10])
+def test_rejects_truncated_books(tmp_path, size):
+    path = str(tmp_path / "book.bin")
+    write_book(path, BOARD_SIZE, 3, 9, {1: 5, 2: 6})
+    with open(path, "r+b") as file:
+        file.truncate(size)
+    with pytest.raises(ValueError, match="book.bin"):
+        OpeningBook(path)
+
+
+def test_rejects_books_for_other_board_sizes(tmp_path):
+    path = str(tmp_path / "book.bin")
+    write_book(path, 8, 3, 9, {1: 5})
+    assert open_book(path, 8).board_width == 8
+    with pytest.raises(ValueError):
+        open_book(path, BOARD_SIZE)
+    with pytest.raises(ValueError):
+        AIConditional(Board(BOARD_SIZE), book_path=path)
+    with pytest.raises(ValueError):
+        ProbabilityDensityAI(Board(BOARD_SIZE), book_path=path)
@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+from battleship_records import (GameRecord, GameRecordWriter, encode_game, read_index, read_records, record_size,
+                                replay)
+from text_battleship_ai_analysis import BOARD_SIZE, AIConditional, Board
+
+SHIP_ART = Board(BOARD_SIZE).SHIP_ART
+SHIP_LENGTHS = list(map(len, SHIP_ART))
+
+
+def play_recorded_game(seed) -> (Board, list[tuple[int, bool]], list[str]):
+    """Plays a seeded game of AIConditional and returns its board, shots and move types"""
+    random.seed(seed)
+    board = Board(BOARD_SIZE)
+    board.auto_place_ships()
+    ai = AIConditional(board)
+    shots = []
+    move_types = []
+    hit, sunk, ship_tile, is_game_over = False, [], "", False
+    while not is_game_over:
+        x, y = ai.get_AI_action(hit, sunk, ship_tile)
+        hit, sunk, ship_tile, is_game_over = board.shoot(x, y)
+        shots.append((x * BOARD_SIZE + y, hit))
+        move_types.append(ai.move_type)
+    return board, shots, move_types
+
+
+def test_encode_then_decode_game():
+    board, shots, move_types = play_recorded_game(1)
+    record = GameRecord(encode_game(board, shots, move_types), BOARD_SIZE, SHIP_LENGTHS)
+    assert record.shot_count == len(shots)
+    assert record.fleet(board.SHIP_ART) == [board.ship_positions[ship[0]] for ship in board.SHIP_ART]
+    assert record.shots() == [(*divmod(cell, BOARD_SIZE), hit) for cell, hit in shots]
+    assert record.move_types() == move_types
+    assert len(record.data) == record_size(len(shots), 1, len(board.SHIP_ART))
+
+
+def test_record_without_move_types():
+    board, shots, move_types = play_recorded_game(2)
+    record = GameRecord(encode_game(board, shots), BOARD_SIZE, SHIP_LENGTHS)
+    assert record.move_types() is None
+    assert len(record.data) == record_size(len(shots), 0, len(board.SHIP_ART))
+
+
+def test_replay_rebuilds_board():
+    board, shots, move_types = play_recorded_game(3)
+    record = GameRecord(encode_game(board, shots), BOARD_SIZE, SHIP_LENGTHS)
+    replayed = replay(record, Board(BOARD_SIZE))
+    assert replayed.private_board == board.private_board
+    assert replayed.public_board == board.public_board
+    assert replayed.is_game_over()
+
+
+def test_encode_rejects_large_boards():
+    board = Board(12)
+    board.auto_place_ships()
+    with pytest.raises(ValueError):
+        encode_game(board, [])
+
+
+def test_write_then_read_chunks(tmp_path):
+    path = str(tmp_path / "games.bsr")
+    games = [encode_game(*play_recorded_game(seed)[:2]) for seed in range(10)]
+    with GameRecordWriter(path, BOARD_SIZE, SHIP_ART, chunk_games=3) as writer:
+        for game in games:
+            writer.add(game)
+    index = read_index(path)
+    assert [entry[1] for entry in index] == [3, 3, 3, 1]
+    records = list(read_records(path))
+    assert [record.data for record in records] == games
+    assert all(record.ship_lengths == SHIP_LENGTHS and record.board_width == BOARD_SIZE for record in records)
+
+    shot_counts = [GameRecord(game, BOARD_SIZE, SHIP_LENGTHS).shot_count for game in games]
+    low, high = sorted(shot_counts)[3], sorted(shot_counts)[6]
+    filtered = [record.data for record in read_records(path, low, high)]
+    assert filtered == [game for game, shots in zip(games, shot_counts) if low <= shots <= high]
+
+
+def test_chunks_outside_the_filter_are_skipped(tmp_path):
+    path = str(tmp_path / "games.bsr")
+    games = [encode_game(*play_recorded_game(seed)[:2]) for seed in range(4)]
+    with GameRecordWriter(path, BOARD_SIZE, SHIP_ART, chunk_games=2) as writer:
+        for game in games:
+            writer.add(game)
+    most_shots = max(entry[4] for entry in read_index(path))
+    assert list(read_records(path, most_shots + 1)) == []
+
+
+def test_chunks_keep_their_fleet(tmp_path):
+    path = str(tmp_path / "games.bsr")
+    board, shots, move_types = play_recorded_game(5)
+    small_art = SHIP_ART[1:]
+    small_board = Board(BOARD_SIZE, small_art)
+    small_board.auto_place_ships()
+    with GameRecordWriter(path, BOARD_SIZE, SHIP_ART) as writer:
+        writer.add(encode_game(board, shots))
+    with GameRecordWriter(path, BOARD_SIZE, small_art) as writer:
+        writer.add(encode_game(small_board, [(0, False)]))
+    full, small = read_records(path)
+    assert replay(full, Board(BOARD_SIZE)).private_board == board.private_board
+    assert small.fleet(small_art) == [small_board.ship_positions[ship[0]] for ship in small_art]
+    assert small.shots() == [(0, 0, False)]
+    with pytest.raises(ValueError):
+        full.fleet(small_art)
+    with pytest.raises(ValueError):
+        replay(small, Board(BOARD_SIZE))
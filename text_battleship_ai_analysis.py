@@ -1,11 +1,31 @@
+import cProfile
+import json
+import platform
+import pstats
 import random
-from time import sleep
-from random import randint, choice
-from copy import deepcopy
+import tracemalloc
+from time import perf_counter, sleep
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import chain
+from math import ceil, sqrt
+from statistics import NormalDist
+
+from battleship_opening_book import open_book
+from battleship_placements import (PLACEMENT_INDEX_MAX_SIZE, get_placement_index, random_sparse_fleet,
+                                   ship_names)
+from battleship_records import FleetCorpus, GameRecordWriter, encode_game
+from battleship_render import render_frame, row_labels
 
 BOARD_SIZE = 10
+# Rounds played by each process in a parallel evaluation run
+SHARD_ROUNDS = 1000
+# Boards with at least this many cells track untried cells with a SparseCellPool
+SPARSE_POOL_MIN_CELLS = 4096
 MISS_MSG = "Miss!"
 HIT_MSG = "Hit!"
+# Functions of a profiled shard listed in the summary and the JSON report
+PROFILE_TOP = 20
 
 
 def print_title():
@@ -74,14 +94,14 @@ def print_instructions(self):
 class Board:
     """Stores data about the battleship board and supplies methods for interacting with the board"""
 
-    def __init__(self, size: int):
+    def __init__(self, size: int, ship_art: list[str] = None):
         # privateBoard shows ships, water, hits, misses and sinks. Never shown unless for debugging and used for
         # internal calculations.
         # publicBoard shows hits, misses, sinks and water. Always shown to the opponent.
         self.private_board = []
         self.public_board = []
         self.board_width = size
-        self.LETTER_TO_COORDINATE_MAP = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J"]
+        self.LETTER_TO_COORDINATE_MAP = row_labels(size)
         # Way a ship is represented on the board
         self.SHIP_ART = ["CCCCC", "BBBB", "SSS", "DDD", "PP"]
         self.SHIP_TILE_TO_NAME = {"C": "CARRIER",
@@ -89,6 +109,10 @@ class Board:
                                   "D": "DESTROYER",
                                   "S": "SUBMARINE",
                                   "P": "PATROL BOAT"}
+        if ship_art is not None:
+            # Any fleet of ships with their own tiles, e.g. from battleship_placements.generate_fleet
+            self.SHIP_ART = list(ship_art)
+            self.SHIP_TILE_TO_NAME = ship_names(self.SHIP_ART)
         # Stores coordinates of each ship tile.
         self.ship_positions = {}
         # Stores health corresponding to a ship. Used to determine if a ship is sunk.
@@ -97,6 +121,12 @@ class Board:
         self.HIT_TILE = "X"
         self.WATER_TILE = "~"
         self.SUNK_TILE = "#"
+        # Ship tiles not hit yet, so is_game_over does not have to look at every health bar
+        self.remaining_health = 0
+        # Callbacks given every change of the public board, see publish
+        self.subscribers = []
+        # Shots that undo_shoot can revert, None unless enable_undo was called
+        self.undo_journal = None
         self.initialise_board(size)
 
     def initialise_board(self, size):
@@ -104,7 +134,7 @@ class Board:
         self.private_board = []
         for i in range(size):
             self.private_board.append([self.WATER_TILE] * size)
-        self.public_board = deepcopy(self.private_board)
+        self.public_board = [row.copy() for row in self.private_board]
 
     def number_to_letter(self, n):
         """Converts y coordinates to the letters used to label rows on the board"""
@@ -114,20 +144,17 @@ class Board:
         """Converts letter used to label rows to a y coordinate"""
         return self.LETTER_TO_COORDINATE_MAP.index(l)
 
-    def print_board(self, showShips=False):
-        """Prints the board"""
+    def render_board(self, showShips=False) -> str:
+        """Returns the board as print_board prints it"""
         if showShips:
             board = self.private_board
         else:
             board = self.public_board
-        print("   0   1   2   3   4   5   6   7   8   9")
-        for y in range(self.board_width):
-            print(" " + "+---" * self.board_width + "+")
-            print(self.number_to_letter(y), end="")
-            for x in range(self.board_width):
-                print("| " + board[x][y] + " ", end="")
-            print("|")
-        print(" " + "+---" * self.board_width + "+")
+        return render_frame(board, self.LETTER_TO_COORDINATE_MAP)
+
+    def print_board(self, showShips=False):
+        """Prints the board"""
+        print(self.render_board(showShips))
 
     def generate_ship_positions(self, ship_art: str, startX: int, startY: int, orientation: str) -> list[int, int]:
         """Returns list of coordinates for all sections of a ship based on its size, position and orientation"""
@@ -142,7 +169,7 @@ class Board:
         return positions
 
     def is_on_board(self, x, y):
-        return (0 <= x <= 9) and (0 <= y <= 9)
+        return (0 <= x < self.board_width) and (0 <= y < self.board_width)
 
     def is_water_tile(self, x, y):
         return self.private_board[x][y] == self.WATER_TILE
@@ -156,6 +183,12 @@ class Board:
     def is_ship_tile(self, x, y):
         return self.private_board[x][y] in self.SHIP_TILE_TO_NAME.keys()
 
+    def shot_cells(self) -> list[int]:
+        """Returns the cell ids of every tile of the public board that is not water"""
+        board_width = self.board_width
+        return [x * board_width + y for x, column in enumerate(self.public_board)
+                for y, tile in enumerate(column) if tile != self.WATER_TILE]
+
     def is_valid_ship_location(self, ship_positions: list[int, int]):
         """Returns true if all proposed position of a ship on water tiles and within the board"""
         for x, y in ship_positions:
@@ -168,24 +201,32 @@ class Board:
         ship_letter = ship[0]
         for x, y in ship_positions:
             self.private_board[x][y] = ship_letter
+        if ship_letter not in self.ship_health_bars:
+            self.remaining_health += len(ship)
         self.ship_positions.setdefault(ship_letter, ship_positions)
         self.ship_health_bars.setdefault(ship_letter, len(ship))
 
-    def auto_place_ships(self):
-        """Places all available ships on the map. Mainly used to place the AI fleet"""
-        for ship in self.SHIP_ART:
-            keep_searching = True
-            # Attempt to find valid x coordinate, y coordinate and orientation that allows us to
-            # place a ship. When a ship can be placed, place the ship.
-            # Repeat until all ships are placed.
-            while keep_searching:
-                start_x = randint(0, self.board_width - 1)
-                start_y = randint(0, self.board_width - 1)
-                orientation = choice(("H", "V"))
-                ship_positions = self.generate_ship_positions(ship, start_x, start_y, orientation)
-                if self.is_valid_ship_location(ship_positions):
-                    keep_searching = False
-                    self.place_ship(ship, ship_positions)
+    def auto_place_ships(self, uniform=False):
+        """Places all available ships on the map. Mainly used to place the AI fleet
+        Ships are drawn from the precomputed placements still open to them, so there are no retries. With uniform
+        every complete fleet is equally likely instead of each ship given the ships placed before it. Boards too large
+        to index draw from random_sparse_fleet, which gives fleets with the same chances."""
+        if self.board_width > PLACEMENT_INDEX_MAX_SIZE:
+            occupied = {x * self.board_width + y for positions in self.ship_positions.values() for x, y in positions}
+            fleet = random_sparse_fleet(self.board_width, self.SHIP_ART, occupied, uniform)
+            for ship, ship_positions in zip(self.SHIP_ART, fleet):
+                self.place_ship(ship, ship_positions)
+            return
+        placement_index = get_placement_index(self.board_width)
+        occupied = 0
+        for positions in self.ship_positions.values():
+            occupied |= placement_index.positions_to_mask(positions)
+        if uniform:
+            fleet = placement_index.uniform_random_fleet(self.SHIP_ART, occupied)
+        else:
+            fleet = placement_index.random_fleet(self.SHIP_ART, occupied)
+        for ship, ship_positions in zip(self.SHIP_ART, fleet):
+            self.place_ship(ship, ship_positions)
 
     def ship_tile_to_art(self, ship_tile: str) -> str:
         """Returns ship art for a ship tile. Returns "CCCCC" for tile "C" """
@@ -202,7 +243,7 @@ class Board:
             letter = command[2]
             orientation = command[3]
             if tile in ships_to_place_tiles:
-                if number.isdigit():
+                if number.isdecimal():
                     if letter in self.LETTER_TO_COORDINATE_MAP:
                         if orientation in ("H", "V"):
                             startX = int(number)
@@ -237,9 +278,9 @@ class Board:
                 print("Ensure command is 4 items long, each item is valid and ship does not overlap another ship")
 
     def is_valid_coordinate(self, command):
-        """Returns true if a coordinate is one number (0-9) followed by one letter (A-J)"""
+        """Returns true if a coordinate is one number followed by one row label, e.g. 0 A"""
         if len(command) == 2:
-            if command[0].isdigit() and command[1] in self.LETTER_TO_COORDINATE_MAP:
+            if command[0].isdecimal() and command[1] in self.LETTER_TO_COORDINATE_MAP:
                 return True
         else:
             return False
@@ -250,21 +291,36 @@ class Board:
         y = self.letter_to_number(action[1])
         return x, y
 
+    def subscribe(self, callback):
+        """Calls callback with every change of the public board from now on, see publish"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def publish(self, x, y, old_tile, new_tile, sunk_ship=""):
+        """Sends (cell, old_tile, new_tile, sunk_ship) to every subscriber, where cell is x * board_width + y and
+        sunk_ship is the ship tile of the ship sunk by the change or "" """
+        if not self.subscribers:
+            return
+        change = (x * self.board_width + y, old_tile, new_tile, sunk_ship)
+        for callback in self.subscribers:
+            callback(change)
+
     def mark_ship_sunk(self, ship_code):
         """Change hit tiles of a sunk ship to sunk tiles on both private and public board"""
         sunk = []
         for x, y in self.ship_positions[ship_code]:
+            old_tile = self.public_board[x][y]
             self.private_board[x][y] = self.SUNK_TILE
             self.public_board[x][y] = self.SUNK_TILE
+            self.publish(x, y, old_tile, self.SUNK_TILE, ship_code)
             sunk.append([x, y])
         return sunk
 
     def is_game_over(self):
         """If health bars of all ships is 0, return True"""
-        for i in self.ship_health_bars.values():
-            if i != 0:
-                return False
-        return True
+        return self.remaining_health == 0
 
     def shoot(self, x, y) -> (bool, list[list[int]], str, bool):
         """Returns hit, sunk, ship_tile, is_game_over"""
@@ -274,19 +330,99 @@ class Board:
         if self.is_water_tile(x, y):
             self.private_board[x][y] = self.MISS_TILE
             self.public_board[x][y] = self.MISS_TILE
+            self.publish(x, y, self.WATER_TILE, self.MISS_TILE)
+            if self.undo_journal is not None:
+                self.undo_journal.append((x, y, ""))
 
         elif self.is_ship_tile(x, y):
             hit = True
             ship_tile = self.private_board[x][y]
             self.ship_health_bars[ship_tile] -= 1
+            self.remaining_health -= 1
             if self.ship_health_bars[ship_tile] == 0:
                 sunk = self.mark_ship_sunk(ship_tile)
             else:
                 self.private_board[x][y] = self.HIT_TILE
                 self.public_board[x][y] = self.HIT_TILE
+                self.publish(x, y, self.WATER_TILE, self.HIT_TILE)
+            if self.undo_journal is not None:
+                self.undo_journal.append((x, y, ship_tile))
+
+        elif self.undo_journal is not None:
+            # Shooting a tile twice changes nothing but still counts as a shot to undo
+            self.undo_journal.append((x, y, None))
 
         return hit, sunk, ship_tile, self.is_game_over()
 
+    def enable_undo(self):
+        """Starts recording shots so undo_shoot can revert them"""
+        self.undo_journal = []
+
+    def undo_shoot(self):
+        """Reverts the last shot recorded since enable_undo, publishing the changes"""
+        x, y, ship_tile = self.undo_journal.pop()
+        if ship_tile is None:
+            return
+        if not ship_tile:
+            self.private_board[x][y] = self.WATER_TILE
+            self.public_board[x][y] = self.WATER_TILE
+            self.publish(x, y, self.MISS_TILE, self.WATER_TILE)
+            return
+        if self.ship_health_bars[ship_tile] == 0:
+            # The shot sank the ship, so the other tiles of the ship go back to hit tiles
+            for ship_x, ship_y in self.ship_positions[ship_tile]:
+                if ship_x != x or ship_y != y:
+                    self.private_board[ship_x][ship_y] = self.HIT_TILE
+                    self.public_board[ship_x][ship_y] = self.HIT_TILE
+                    self.publish(ship_x, ship_y, self.SUNK_TILE, self.HIT_TILE)
+        self.ship_health_bars[ship_tile] += 1
+        self.remaining_health += 1
+        old_tile = self.public_board[x][y]
+        self.private_board[x][y] = ship_tile
+        self.public_board[x][y] = self.WATER_TILE
+        self.publish(x, y, old_tile, self.WATER_TILE)
+
+    def snapshot(self) -> tuple:
+        """Returns the game state packed into an immutable tuple for restore. Ship positions are never changed after
+        a ship is placed, so they are shared rather than copied."""
+        return (tuple("".join(row) for row in self.private_board),
+                tuple("".join(row) for row in self.public_board),
+                tuple(self.ship_positions.items()),
+                tuple(self.ship_health_bars.items()),
+                self.remaining_health)
+
+    def restore(self, snapshot: tuple):
+        """Puts the board back to the state of a snapshot, publishing every tile of the public board that changes.
+        The undo journal, if enabled, is cleared."""
+        private_rows, public_rows, ship_positions, ship_health_bars, self.remaining_health = snapshot
+        for x, (private_row, public_row) in enumerate(zip(private_rows, public_rows)):
+            self.private_board[x][:] = private_row
+            if self.subscribers:
+                for y, new_tile in enumerate(public_row):
+                    old_tile = self.public_board[x][y]
+                    if old_tile != new_tile:
+                        self.public_board[x][y] = new_tile
+                        self.publish(x, y, old_tile, new_tile)
+            else:
+                self.public_board[x][:] = public_row
+        self.ship_positions = dict(ship_positions)
+        self.ship_health_bars = dict(ship_health_bars)
+        if self.undo_journal is not None:
+            self.undo_journal = []
+
+    def clone(self) -> "Board":
+        """Returns an independent copy of the game state, much faster than deepcopy. Subscribers and the undo journal
+        are not copied."""
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.private_board = [row.copy() for row in self.private_board]
+        clone.public_board = [row.copy() for row in self.public_board]
+        clone.ship_positions = self.ship_positions.copy()
+        clone.ship_health_bars = self.ship_health_bars.copy()
+        clone.subscribers = []
+        clone.undo_journal = None
+        return clone
+
     def get_message(self, hit, sunk, ship_tile):
         """Returns message to the player on status of their shots like "Hit!", "Miss!", "Enemy Carrier sunk" """
         if sunk:
@@ -315,7 +451,7 @@ class Player:
 class AIConditional:
     """AI has series of conditions based on whether it hits, misses, or sinks. It also considers which ship it sunk"""
 
-    def __init__(self, player_board: Board) -> None:
+    def __init__(self, player_board: Board, book_path=None) -> None:
         self.name = "AIConditional"
         self.player_board = player_board
         self.mode = "seek"
@@ -330,9 +466,20 @@ class AIConditional:
         self.pointer_y = None
         self.do_flank_move = False
         self.first_move = True
+        # Kind of move the last shot was: "seek", "book", "attack" or "flank", see battleship_records.MOVE_TYPES
+        self.move_type = "seek"
+        # Water tiles seek has not ruled out yet. A tile only ever loses orientations, as the board fills up and the
+        # shortest ship left gets longer, so a tile that fails get_possible_orientations once never passes again.
+        # None when it has to be rebuilt from the board, which seek does the next time it is called.
+        self.seek_cells = self.water_cells()
+        player_board.subscribe(self.on_board_change)
+        # Opening book seek plays from until the first hit, book_key is None once out of book
+        self.book = open_book(book_path, player_board.board_width) if book_path else None
+        self.book_key = self.book.empty_key if self.book else None
 
     def get_AI_action(self, hit, sunk: list, shipTile) -> tuple[int, int]:
         """Returns x,y coordinate of the AI's shot"""
+        self.move_type = "attack"
 
         if sunk:
             self.do_flank_move = False
@@ -403,18 +550,47 @@ class AIConditional:
             self.selected_orientation = valid_orientations.pop(random.randint(0, len(valid_orientations) - 1))
             return self.move_along_orientation(self.selected_orientation[0], self.selected_orientation[1])
 
+    def water_cells(self) -> "CellPool":
+        board_width = self.player_board.board_width
+        return new_cell_pool(board_width * board_width, self.player_board.shot_cells())
+
+    def on_board_change(self, change):
+        """Keeps seek_cells to water tiles as the board changes"""
+        cell, old_tile, new_tile, sunk_ship = change
+        if new_tile != self.WATER_TILE:
+            if self.seek_cells is not None:
+                self.seek_cells.discard(cell)
+        else:
+            # An undone shot can make tiles seek already ruled out viable again, so start from every water tile. A
+            # restore publishes one change per tile, so the pool is only rebuilt once, when seek next needs it.
+            self.seek_cells = None
+        if self.book_key is not None:
+            if new_tile in (self.player_board.MISS_TILE, self.player_board.HIT_TILE):
+                self.book_key = self.book.next_key(self.book_key, cell, new_tile == self.player_board.HIT_TILE)
+            else:
+                self.book_key = None
+
     def seek(self):
         """When seeking, shoot random tiles that are connected to enough tiles such that
-        the group of tiles is large enough to contain a ship."""
-        valid_move = False
-        while not valid_move:
-            self.move_x = random.randint(0, self.player_board.board_width - 1)
-            self.move_y = random.randint(0, self.player_board.board_width - 1)
-
-            if self.player_board.public_board[self.move_x][self.move_y] == self.WATER_TILE:
-                orientations = self.get_possible_orientations(self.move_x, self.move_y)
-                if orientations:
-                    return self.move_x, self.move_y
+        the group of tiles is large enough to contain a ship. Tiles drawn from seek_cells are water, and a tile
+        that fails is dropped from seek_cells so it is never drawn again. While in the opening book, seek plays the
+        book's move instead."""
+        if self.book_key is not None:
+            cell = self.book.lookup(self.book_key)
+            if cell is not None:
+                self.move_type = "book"
+                self.move_x, self.move_y = divmod(cell, self.player_board.board_width)
+                return self.move_x, self.move_y
+            self.book_key = None
+        self.move_type = "seek"
+        if self.seek_cells is None:
+            self.seek_cells = self.water_cells()
+        while True:
+            cell = self.seek_cells.random_cell()
+            self.move_x, self.move_y = divmod(cell, self.player_board.board_width)
+            if self.get_possible_orientations(self.move_x, self.move_y):
+                return self.move_x, self.move_y
+            self.seek_cells.discard(cell)
 
     def flank(self):
         """flanking is used when the first shot on a ship hits the middle of the ship
@@ -434,6 +610,7 @@ class AIConditional:
             index += 1
 
         if flank_orientation in orientations:
+            self.move_type = "flank"
             self.do_flank_move = True
             self.selected_orientation = flank_orientation.copy()
         else:
@@ -500,23 +677,123 @@ class AIConditional:
 
 
 
+class CellPool:
+    """Cell ids that have not been tried yet. Cells sit in a list and removing one swaps the last cell into its place,
+    so drawing a random cell, removing a given cell and checking membership are all O(1) with no retries."""
+
+    def __init__(self, cells=()):
+        self.cells = list(cells)
+        # Index of each cell in self.cells
+        self.positions = {cell: index for index, cell in enumerate(self.cells)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.positions
+
+    def add(self, cell):
+        if cell not in self.positions:
+            self.positions[cell] = len(self.cells)
+            self.cells.append(cell)
+
+    def discard(self, cell):
+        """Removes cell if it is in the pool"""
+        index = self.positions.pop(cell, None)
+        if index is None:
+            return
+        last_cell = self.cells.pop()
+        if last_cell != cell:
+            self.cells[index] = last_cell
+            self.positions[last_cell] = index
+
+    def random_cell(self) -> int:
+        """Returns a uniformly random cell without removing it"""
+        return self.cells[random.randrange(len(self.cells))]
+
+    def pop_random(self) -> int:
+        """Removes and returns a uniformly random cell"""
+        cell = self.random_cell()
+        self.discard(cell)
+        return cell
+
+
+class SparseCellPool:
+    """Cell ids 0 to count - 1 less the removed ones, with the interface of CellPool. Only removed cells are stored,
+    so a pool of a large board is made in O(1) rather than listing every cell.
+
+    random_cell draws cell ids until one is not removed, which takes less than two draws on average while at most
+    half the cells are removed. Past that the cells left are moved into a CellPool, once."""
+
+    def __init__(self, count: int, removed=()):
+        self.count = count
+        self.removed = set(removed)
+        # CellPool of the cells left once more than half are removed
+        self.pool = None
+        self.compact()
+
+    def __len__(self):
+        if self.pool is not None:
+            return len(self.pool)
+        return self.count - len(self.removed)
+
+    def __contains__(self, cell):
+        if self.pool is not None:
+            return cell in self.pool
+        return 0 <= cell < self.count and cell not in self.removed
+
+    def add(self, cell):
+        if self.pool is not None:
+            self.pool.add(cell)
+        else:
+            self.removed.discard(cell)
+
+    def discard(self, cell):
+        """Removes cell if it is in the pool"""
+        if self.pool is not None:
+            self.pool.discard(cell)
+        elif 0 <= cell < self.count:
+            self.removed.add(cell)
+            self.compact()
+
+    def compact(self):
+        if self.pool is None and 2 * len(self.removed) > self.count:
+            self.pool = CellPool(cell for cell in range(self.count) if cell not in self.removed)
+            self.removed = set()
+
+    def random_cell(self) -> int:
+        """Returns a uniformly random cell without removing it"""
+        if self.pool is not None:
+            return self.pool.random_cell()
+        while True:
+            cell = random.randrange(self.count)
+            if cell not in self.removed:
+                return cell
+
+    def pop_random(self) -> int:
+        """Removes and returns a uniformly random cell"""
+        cell = self.random_cell()
+        self.discard(cell)
+        return cell
+
+
+def new_cell_pool(count: int, removed=()) -> CellPool:
+    """Returns a pool of cell ids 0 to count - 1 less removed, a SparseCellPool on large boards"""
+    if count >= SPARSE_POOL_MIN_CELLS:
+        return SparseCellPool(count, removed)
+    removed = set(removed)
+    return CellPool(cell for cell in range(count) if cell not in removed)
+
+
 class BaselineAI:
     """AI that shoots in random locations that it has not shot in before"""
     def __init__(self, board: Board):
-        self.already_shot_locations = []
         self.board_width = board.board_width
+        self.untried_cells = new_cell_pool(self.board_width * self.board_width)
         self.name = "BaselineAI"
 
     def get_AI_action(self, *args, **kwargs):
-        move_x = random.randint(0, self.board_width - 1)
-        move_y = random.randint(0, self.board_width - 1)
-        move = [move_x, move_y]
-        while move in self.already_shot_locations:
-            move_x = random.randint(0, self.board_width - 1)
-            move_y = random.randint(0, self.board_width - 1)
-            move = [move_x, move_y]
-        self.already_shot_locations.append(move)
-        return move[0], move[1]
+        return divmod(self.untried_cells.pop_random(), self.board_width)
 
 class AITemplate:
     """Create your own AI with this template"""
@@ -527,40 +804,489 @@ class AITemplate:
     def get_AI_action(self) -> (int, int):
         pass
 
-def main(AIClass , rounds=100000, verbose=False, interval=1000):
+class ShotStatistics:
+    """Distribution of shots per game kept as a histogram, so memory does not grow with the number of games.
+    Games of max_shots or more share the last bucket, the exact minimum, maximum, mean and variance are kept
+    separately. Statistics from separate runs can be merged into one."""
+
+    def __init__(self, max_shots=BOARD_SIZE * BOARD_SIZE):
+        self.histogram = [0] * (max_shots + 1)
+        self.games = 0
+        self.total = 0
+        self.total_squared = 0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, shots):
+        self.histogram[min(shots, len(self.histogram) - 1)] += 1
+        self.games += 1
+        self.total += shots
+        self.total_squared += shots * shots
+        if self.minimum is None or shots < self.minimum:
+            self.minimum = shots
+        if self.maximum is None or shots > self.maximum:
+            self.maximum = shots
+
+    def merge(self, other: "ShotStatistics"):
+        if len(other.histogram) > len(self.histogram):
+            self.histogram += [0] * (len(other.histogram) - len(self.histogram))
+        for shots, games in enumerate(other.histogram):
+            self.histogram[shots] += games
+        self.games += other.games
+        self.total += other.total
+        self.total_squared += other.total_squared
+        if other.minimum is not None and (self.minimum is None or other.minimum < self.minimum):
+            self.minimum = other.minimum
+        if other.maximum is not None and (self.maximum is None or other.maximum > self.maximum):
+            self.maximum = other.maximum
+
+    def mean(self) -> float:
+        return self.total / self.games
+
+    def variance(self) -> float:
+        """Sample variance of shots per game"""
+        if self.games < 2:
+            return float("inf")
+        return (self.total_squared - self.total * self.total / self.games) / (self.games - 1)
+
+    def percentile(self, percent) -> int:
+        """Smallest number of shots that at least percent % of games needed no more than"""
+        rank = max(1, ceil(percent / 100 * self.games))
+        games_so_far = 0
+        for shots, games in enumerate(self.histogram):
+            games_so_far += games
+            if games_so_far >= rank:
+                return shots
+
+    def tail_mean(self, percent=1) -> float:
+        """Average shots of the worst percent % of games"""
+        tail_games = max(1, ceil(percent / 100 * self.games))
+        games_left = tail_games
+        total = 0
+        for shots in range(len(self.histogram) - 1, -1, -1):
+            games = min(self.histogram[shots], games_left)
+            total += shots * games
+            games_left -= games
+            if not games_left:
+                break
+        return total / tail_games
+
+
+class GameAnalytics:
+    """Per ship and per kind of move statistics of games, fed one game at a time as its shot log: the (ship tile or
+    "" for a miss, sunk, move type) of each shot. Memory does not grow with the number of games and analytics of
+    separate runs can be merged into one."""
+
+    def __init__(self):
+        self.games = 0
+        # Shot of the game each ship was sunk on, and shots after the first hit on a ship until the shot that sank it
+        self.survival = {}
+        self.hit_to_sink = {}
+        # [shots, hits] of each kind of move, for AIs with a move_type such as AIConditional
+        self.move_types = {}
+
+    def add_game(self, shot_log):
+        self.games += 1
+        first_hits = {}
+        for shot, (ship_tile, sunk, move_type) in enumerate(shot_log, 1):
+            if move_type is not None:
+                counts = self.move_types.setdefault(move_type, [0, 0])
+                counts[0] += 1
+                if ship_tile:
+                    counts[1] += 1
+            if ship_tile:
+                first_hit = first_hits.setdefault(ship_tile, shot)
+                if sunk:
+                    self.survival.setdefault(ship_tile, ShotStatistics()).add(shot)
+                    self.hit_to_sink.setdefault(ship_tile, ShotStatistics()).add(shot - first_hit)
+
+    def merge(self, other: "GameAnalytics"):
+        self.games += other.games
+        for mine, theirs in ((self.survival, other.survival), (self.hit_to_sink, other.hit_to_sink)):
+            for ship_tile, statistics in theirs.items():
+                mine.setdefault(ship_tile, ShotStatistics()).merge(statistics)
+        for move_type, (shots, hits) in other.move_types.items():
+            counts = self.move_types.setdefault(move_type, [0, 0])
+            counts[0] += shots
+            counts[1] += hits
+
+    def print_summary(self, ship_art: list[str], ship_names: dict[str, str]):
+        for ship in ship_art:
+            survival = self.survival.get(ship[0])
+            if survival:
+                print(f"{ship_names[ship[0]]} sunk on shot {survival.mean():.2f} on average "
+                      f"(p10/p50/p90 {survival.percentile(10)}/{survival.percentile(50)}/{survival.percentile(90)}), "
+                      f"{self.hit_to_sink[ship[0]].mean():.2f} shots from first hit to sink")
+        total_shots = sum(shots for shots, hits in self.move_types.values())
+        for move_type, (shots, hits) in self.move_types.items():
+            print(f"{move_type} shots: {shots / self.games:.2f} per game ({shots / total_shots * 100:.1f}%), "
+                  f"{shots - hits} missed ({(shots - hits) / shots * 100:.1f}%)")
+
+
+class Timings:
+    """Seconds spent in and calls made to each timed part of an evaluation run, e.g. "Board.shoot". Timing a shot
+    costs about 1 us for the perf_counter calls and dict updates, around a tenth of a 10x10 game. Timings of separate
+    shards can be merged into one."""
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+
+    def add(self, name, seconds):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def merge(self, other: "Timings"):
+        for name, seconds in other.seconds.items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + other.calls[name]
+
+    def report(self) -> dict[str, dict]:
+        return {name: {"seconds": seconds, "calls": self.calls[name], "us_per_call": seconds / self.calls[name] * 1e6}
+                for name, seconds in self.seconds.items()}
+
+    def print_summary(self):
+        total = sum(self.seconds.values())
+        for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            print(f"{name:<40}{seconds:9.3f}s {seconds / total * 100:5.1f}% {self.calls[name]:>11} calls "
+                  f"{seconds / self.calls[name] * 1e6:9.2f} us/call")
+
+
+class EvaluationTotals:
+    """Running totals of an evaluation run. Totals from separate shards can be merged into one"""
+
+    def __init__(self):
+        self.games = 0
+        self.shots = 0
+        self.hits = 0
+        self.shot_statistics = ShotStatistics()
+        self.analytics = GameAnalytics()
+        # Encoded games when the run is recorded, written out by main as each shard comes in
+        self.records = []
+        # Where the time went when the run is instrumented, see play_round
+        self.timings = None
+        # What the AI class reports of its own work, for AI classes with shard_statistics, see play_shard
+        self.ai_statistics = None
+
+    def add_game(self, shots, hits):
+        self.games += 1
+        self.shots += shots
+        self.hits += hits
+        self.shot_statistics.add(shots)
+
+    def merge(self, other: "EvaluationTotals"):
+        """Adds the totals of another run, e.g. a shard played by another process"""
+        self.games += other.games
+        self.shots += other.shots
+        self.hits += other.hits
+        self.shot_statistics.merge(other.shot_statistics)
+        self.analytics.merge(other.analytics)
+        if other.timings is not None:
+            if self.timings is None:
+                self.timings = Timings()
+            self.timings.merge(other.timings)
+        if other.ai_statistics is not None:
+            if self.ai_statistics is None:
+                self.ai_statistics = type(other.ai_statistics)()
+            self.ai_statistics.merge(other.ai_statistics)
+
+    def shots_variance(self) -> float:
+        """Sample variance of shots to win"""
+        return self.shot_statistics.variance()
+
+    def confidence_half_width(self, confidence=0.95) -> float:
+        """Half width of the normal confidence interval of average shots to win"""
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        return z * sqrt(self.shots_variance() / self.games)
+
+
+def play_round(AIClass, BoardClass=Board, verbose=False, uniform_fleets=False, records: list = None,
+               shot_log: list = None, timings: Timings = None, fleet: list[list[list[int]]] = None) -> (int, int):
+    """Plays one game on a random board and returns the number of shots and hits the AI needed to win.
+    If records is given the encoded game is appended to it. If shot_log is given the (ship tile or "" for a miss,
+    sunk, move type or None) of every shot is appended to it, see GameAnalytics. If timings is given the time spent
+    setting up the game, placing the fleet, in each get_AI_action by move type and in each shoot is added to it.
+    If fleet, the positions of each ship, is given the board has that fleet instead of a random one"""
+    if timings is not None:
+        setup_start = perf_counter()
+    evaluation_board = BoardClass(BOARD_SIZE)
+    if timings is not None:
+        placement_start = perf_counter()
+    if fleet is None:
+        evaluation_board.auto_place_ships(uniform_fleets)
+    else:
+        for ship, ship_positions in zip(evaluation_board.SHIP_ART, fleet):
+            evaluation_board.place_ship(ship, ship_positions)
+    if timings is not None:
+        placement_end = perf_counter()
+    is_game_over = False
+    AI = AIClass(evaluation_board)
+    if timings is not None:
+        timings.add("fleet placement", placement_end - placement_start)
+        timings.add("game setup", perf_counter() - placement_end + placement_start - setup_start)
+        decision_name = f"{AI.name}.get_AI_action"
+    shots = 0
+    hits = 0
+    AI_hit = False
+    AI_sink = []
+    AI_shipTile = ""
+    shot_cells = []
+    move_types = []
+    while not is_game_over:
+        if verbose:
+            print("evaluation board")
+            evaluation_board.print_board(showShips=True)
+        if timings is not None:
+            decision_start = perf_counter()
+        x, y = AI.get_AI_action(AI_hit, AI_sink, AI_shipTile)
+        if timings is not None:
+            shot_start = perf_counter()
+        AI_hit, AI_sink, AI_shipTile, is_game_over = evaluation_board.shoot(x, y)
+        move_type = getattr(AI, "move_type", None)
+        if timings is not None:
+            shot_end = perf_counter()
+            timings.add("Board.shoot", shot_end - shot_start)
+            timings.add(decision_name if move_type is None else f"{decision_name}[{move_type}]",
+                        shot_start - decision_start)
+        if AI_hit:
+            hits += 1
+        shots += 1
+        if records is not None:
+            shot_cells.append((x * BOARD_SIZE + y, AI_hit))
+            move_types.append(move_type)
+        if shot_log is not None:
+            shot_log.append((AI_shipTile, bool(AI_sink), move_type))
+    if records is not None:
+        records.append(encode_game(evaluation_board, shot_cells, None if move_type is None else move_types))
+    return shots, hits
+
+
+def play_shard(AIClass, BoardClass, first_round, rounds, seed=None, verbose=False, uniform_fleets=False,
+               record=False, instrument=False, corpus_path=None) -> EvaluationTotals:
+    """Plays rounds first_round to first_round + rounds - 1 and returns their totals.
+    If seed is given the shard gets its own RNG stream derived from the seed and first_round, so a shard plays the
+    same games whichever process runs it. With record the totals also hold the record of every game, and with
+    instrument their Timings. With corpus_path round i is played on fleet i of that fleet corpus, wrapping around
+    at its end, instead of a random fleet.
+    An AI class with a shard_statistics static method, returning mergeable statistics of work it shares between
+    games in this process such as ExpectimaxAI's transposition table, has what this shard added kept in the totals"""
+    if seed is not None:
+        random.seed(f"{seed}:{first_round}")
+    totals = EvaluationTotals()
+    if instrument:
+        totals.timings = Timings()
+    ship_art = BoardClass(BOARD_SIZE).SHIP_ART
+    corpus = None if corpus_path is None else FleetCorpus(corpus_path)
+    shot_log = []
+    shard_statistics = getattr(AIClass, "shard_statistics", None)
+    statistics_before = None if shard_statistics is None else shard_statistics()
+    try:
+        if corpus is not None:
+            corpus.check(BOARD_SIZE, ship_art)
+        for i in range(first_round, first_round + rounds):
+            fleet = None if corpus is None else corpus.fleet(i % len(corpus), ship_art)
+            totals.add_game(*play_round(AIClass, BoardClass, verbose, uniform_fleets,
+                                        totals.records if record else None, shot_log, totals.timings, fleet))
+            totals.analytics.add_game(shot_log)
+            shot_log.clear()
+        if shard_statistics is not None:
+            totals.ai_statistics = shard_statistics().since(statistics_before)
+    finally:
+        if corpus is not None:
+            corpus.close()
+    return totals
+
+
+def profile_shard(profile_path, *shard_arguments) -> (EvaluationTotals, pstats.Stats):
+    """Plays a shard, taking the same arguments as play_shard, under cProfile in this process. Saves the profile to
+    profile_path, which pstats or snakeviz can open, and returns the shard's totals and the profile"""
+    profile = cProfile.Profile()
+    totals = profile.runcall(play_shard, *shard_arguments)
+    profile.dump_stats(profile_path)
+    return totals, pstats.Stats(profile).sort_stats("cumulative")
+
+
+def profile_report(stats: pstats.Stats, top=PROFILE_TOP) -> list[dict]:
+    """Returns the functions with the most cumulative time in a profile"""
+    report = []
+    for (file, line, function), (primitive_calls, calls, own_time, cumulative_time, callers) in stats.stats.items():
+        report.append({"function": f"{file}:{line}({function})", "calls": calls, "own_seconds": own_time,
+                       "cumulative_seconds": cumulative_time})
+    return sorted(report, key=lambda function: -function["cumulative_seconds"])[:top]
+
+
+class RunProgress:
+    """Games per second, estimated time left and peak memory of a run, printed each time another interval of rounds
+    is done and kept for the JSON report. Peak memory is traced with tracemalloc when track_memory is set. Tracing
+    makes every allocation in this process several times slower, and workers of a parallel run are not traced."""
+
+    def __init__(self, rounds, interval, track_memory=False):
+        self.rounds = rounds
+        self.interval = interval
+        self.next_report = interval
+        self.start = perf_counter()
+        self.samples = []
+        if track_memory:
+            tracemalloc.start()
+
+    def update(self, games):
+        if games < self.next_report:
+            return
+        self.next_report = (games // self.interval + 1) * self.interval
+        seconds = perf_counter() - self.start
+        sample = {"games": games, "seconds": seconds, "games_per_second": games / seconds,
+                  "eta_seconds": (self.rounds - games) / (games / seconds)}
+        line = f"interval {games}: {sample['games_per_second']:.0f} games/s, ETA {sample['eta_seconds']:.0f}s"
+        if tracemalloc.is_tracing():
+            sample["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+            line += f", peak memory {sample['peak_memory_bytes'] / 1e6:.1f} MB"
+        self.samples.append(sample)
+        print(line)
+
+    def finish(self) -> float:
+        """Stops tracing memory and returns the seconds the run took"""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return perf_counter() - self.start
+
+
+def write_report(path, name, totals: "EvaluationTotals", progress: RunProgress, seconds, workers, seed,
+                 profile: pstats.Stats = None):
+    """Writes the results, timings, progress and profile of a run to path as JSON"""
+    report = {"python": platform.python_version(), "AI": name, "workers": workers, "seed": seed,
+              "games": totals.games, "seconds": seconds, "games_per_second": totals.games / seconds,
+              "average_shots": totals.shots / totals.games, "hits": totals.hits, "shots": totals.shots,
+              "timings": totals.timings.report() if totals.timings else {}, "progress": progress.samples,
+              "peak_memory_bytes": max((sample.get("peak_memory_bytes", 0) for sample in progress.samples), default=0),
+              "profile": profile_report(profile) if profile else []}
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+
+
+def split_rounds(rounds, shard_rounds=SHARD_ROUNDS) -> list[tuple[int, int]]:
+    """Splits rounds into (first_round, rounds) shards of at most shard_rounds"""
+    return [(first_round, min(shard_rounds, rounds - first_round)) for first_round in range(0, rounds, shard_rounds)]
+
+
+def play_shards(AIClass, BoardClass, shards, seed=None, verbose=False, uniform_fleets=False, workers=1, record=False,
+                instrument=False, corpus_path=None):
+    """Yields the totals of each shard in order. With workers > 1 the shards are played by a pool of processes,
+    keeping only a few queued per worker so a caller that stops early does not wait for the rest"""
+    if workers == 1:
+        for first_round, shard_rounds in shards:
+            yield play_shard(AIClass, BoardClass, first_round, shard_rounds, seed, verbose, uniform_fleets, record,
+                             instrument, corpus_path)
+        return
+    shards = iter(shards)
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for first_round, shard_rounds in shards:
+                pending.append(executor.submit(play_shard, AIClass, BoardClass, first_round, shard_rounds, seed,
+                                               verbose, uniform_fleets, record, instrument, corpus_path))
+                if len(pending) == 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def print_summary(name, totals: EvaluationTotals, confidence=0.95):
+    statistics = totals.shot_statistics
+    print(f"{name} for {totals.games} rounds of battleship")
+    print(f"Average shots to win: {totals.shots / totals.games}")
+    print(f"{confidence * 100:g}% confidence interval: +/- {totals.confidence_half_width(confidence)}")
+    print(f"Standard deviation: {sqrt(statistics.variance())}")
+    print(f"Shots to win min/p50/p90/p95/p99/max: {statistics.minimum}/{statistics.percentile(50)}/"
+          f"{statistics.percentile(90)}/{statistics.percentile(95)}/{statistics.percentile(99)}/{statistics.maximum}")
+    print(f"Average shots of the worst 1% of games: {statistics.tail_mean(1)}")
+    print(f"Hit percentage: {(totals.hits / totals.shots) * 100}%")
+    print(f"Miss percentage: {((totals.shots - totals.hits) / totals.shots) * 100}%")
+    if totals.analytics.games:
+        board = Board(BOARD_SIZE)
+        totals.analytics.print_summary(board.SHIP_ART, board.SHIP_TILE_TO_NAME)
+    if totals.timings:
+        totals.timings.print_summary()
+    if totals.ai_statistics is not None:
+        print(totals.ai_statistics.report())
+
+
+def main(AIClass , rounds=100000, verbose=False, interval=1000, BoardClass=Board, workers=1, seed=None,
+         uniform_fleets=False, precision=None, confidence=0.95, min_rounds=SHARD_ROUNDS, record_path=None,
+         heatmap_path=None, instrument=False, report_path=None, profile_path=None, trace_memory=False, corpus=None):
     """Compute number of shots for AI to sink all ships in a random board. AI is NOT fighting an opponent here
     This tests how good the AI is deducing ship position based on hit/miss/sunk information
+    BoardClass can be swapped for another engine with the same API such as battleship_bitboard.BitBoard
+    Rounds are played in shards of SHARD_ROUNDS. If seed is given every shard is seeded from it, so the same seed
+    gives the same summary for any number of workers. With workers > 1 the shards are played by a pool of processes.
+    uniform_fleets makes every valid fleet equally likely instead of placing ships one after another.
+    With precision the run stops early, at the end of the first shard where the confidence interval of average shots
+    to win is within +/- precision shots and at least min_rounds have been played. rounds is then the most it plays.
+    With record_path every game is appended to that game record file, see battleship_records.
+    With heatmap_path per tile heatmaps of the run are printed and saved to that .npy file, see battleship_heatmaps.
+    Every interval rounds the games per second and estimated time left are printed. With instrument the time spent
+    placing fleets, setting up games, in Board.shoot and in get_AI_action by move type is summed and printed.
+    With report_path the run is instrumented and written to that file as JSON.
+    With profile_path the first shard is played under cProfile in this process and saved to that file.
+    With trace_memory peak memory is traced with tracemalloc and printed each interval, which slows the run down.
+    With corpus, the path of a fleet corpus (see battleship_fleet_corpus), round i is played on fleet i of the corpus
+    so every AI evaluated on it sees the same boards.
     """
-    total_shots = 0
-    total_hits = 0
-    for i in range(rounds):
-        evaluation_board = Board(10)
-        evaluation_board.auto_place_ships()
-        is_game_over = False
-        AI = AIClass(evaluation_board)
-        shots = 0
-        hits = 0
-        AI_hit = False
-        AI_sink = []
-        AI_shipTile = ""
-        while not is_game_over:
-            if verbose:
-                print("evaluation board")
-                evaluation_board.print_board(showShips=True)
-            x, y = AI.get_AI_action(AI_hit, AI_sink, AI_shipTile)
-            AI_hit, AI_sink, AI_shipTile, is_game_over = evaluation_board.shoot(x, y)
-            if AI_hit:
-                hits += 1
-            shots += 1
-        total_shots += shots
-        total_hits += hits
-        if i % interval == 0:
-            print(f"interval {i}")
-
-    print(f"{AI.name} for {rounds} rounds of battleship")
-    print(f"Average shots to win: {total_shots / rounds}")
-    print(f"Hit percentage: {(total_hits / total_shots) * 100}%")
-    print(f"Miss percentage: {((total_shots - total_hits) / total_shots) * 100}%")
+    board = BoardClass(BOARD_SIZE)
+    name = AIClass(board).name
+    heatmaps = None
+    if heatmap_path is not None:
+        # Imported here as heatmaps need NumPy and the rest of the evaluation does not
+        from battleship_heatmaps import Heatmaps
+        heatmaps = Heatmaps(BOARD_SIZE)
+    if workers > 1 and seed is None:
+        # Forked workers start with a copy of the parent's RNG, so they always need their own seeds
+        seed = random.getrandbits(64)
+        print(f"seed {seed}")
+    instrument = instrument or report_path is not None
+    record = record_path is not None or heatmap_path is not None
+    totals = EvaluationTotals()
+    writer = None if record_path is None else GameRecordWriter(record_path, BOARD_SIZE, Board(BOARD_SIZE).SHIP_ART)
+    progress = RunProgress(rounds, interval, trace_memory)
+    shards = split_rounds(rounds)
+    profile = None
+    try:
+        shard_results = play_shards(AIClass, BoardClass, shards[1:] if profile_path else shards, seed, verbose,
+                                    uniform_fleets, workers, record, instrument, corpus)
+        if profile_path is not None:
+            first_shard, profile = profile_shard(profile_path, AIClass, BoardClass, *shards[0], seed, verbose,
+                                                 uniform_fleets, record, instrument, corpus)
+            shard_results = chain([first_shard], shard_results)
+        for shard_totals in shard_results:
+            if heatmaps is not None:
+                heatmaps.add_records(shard_totals.records, len(board.SHIP_ART))
+            if writer is not None:
+                for game_record in shard_totals.records:
+                    writer.add(game_record)
+            shard_totals.records = []
+            totals.merge(shard_totals)
+            progress.update(totals.games)
+            if (precision is not None and totals.games >= min_rounds
+                    and totals.confidence_half_width(confidence) <= precision):
+                print(f"Target precision reached after {totals.games} rounds")
+                break
+    finally:
+        seconds = progress.finish()
+        if writer is not None:
+            writer.close()
+
+    print_summary(name, totals, confidence)
+    print(f"{totals.games} games in {seconds:.1f}s, {totals.games / seconds:.0f} games/s")
+    if profile is not None:
+        print(f"Profile of the first shard, saved to {profile_path}")
+        profile.print_stats(PROFILE_TOP)
+    if report_path is not None:
+        write_report(report_path, name, totals, progress, seconds, workers, seed, profile)
+    if heatmaps is not None:
+        heatmaps.save(heatmap_path)
+        heatmaps.print_summary()
 
 
 if __name__ == '__main__':
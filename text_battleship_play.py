@@ -1,7 +1,16 @@
 import random
 from time import sleep
-from random import randint, choice
-from copy import deepcopy
+from typing import TYPE_CHECKING
+
+from battleship_opening_book import open_book
+from battleship_placements import (PLACEMENT_INDEX_MAX_SIZE, get_placement_index, random_sparse_fleet,
+                                   ship_names)
+from battleship_records import GameRecordWriter, encode_game
+from battleship_render import BoardView, render_frame, row_labels
+from text_battleship_ai_analysis import new_cell_pool
+
+if TYPE_CHECKING:
+    from text_battleship_ai_analysis import CellPool
 
 BOARD_SIZE = 10
 MISS_MSG = "Miss!"
@@ -74,14 +83,14 @@ def print_instructions(self):
 class Board:
     """Stores data about the battleship board and supplies methods for interacting with the board"""
 
-    def __init__(self, size: int):
+    def __init__(self, size: int, ship_art: list[str] = None):
         # privateBoard shows ships, water, hits, misses and sinks. Never shown unless for debugging and used for
         # internal calculations.
         # publicBoard shows hits, misses, sinks and water. Always shown to the opponent.
         self.private_board = []
         self.public_board = []
         self.board_width = size
-        self.LETTER_TO_COORDINATE_MAP = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J"]
+        self.LETTER_TO_COORDINATE_MAP = row_labels(size)
         # Way a ship is represented on the board
         self.SHIP_ART = ["CCCCC", "BBBB", "SSS", "DDD", "PP"]
         self.SHIP_TILE_TO_NAME = {"C": "CARRIER",
@@ -89,6 +98,10 @@ class Board:
                                   "D": "DESTROYER",
                                   "S": "SUBMARINE",
                                   "P": "PATROL BOAT"}
+        if ship_art is not None:
+            # Any fleet of ships with their own tiles, e.g. from battleship_placements.generate_fleet
+            self.SHIP_ART = list(ship_art)
+            self.SHIP_TILE_TO_NAME = ship_names(self.SHIP_ART)
         # Stores coordinates of each ship tile.
         self.ship_positions = {}
         # Stores health corresponding to a ship. Used to determine if a ship is sunk.
@@ -97,6 +110,12 @@ class Board:
         self.HIT_TILE = "X"
         self.WATER_TILE = "~"
         self.SUNK_TILE = "#"
+        # Ship tiles not hit yet, so is_game_over does not have to look at every health bar
+        self.remaining_health = 0
+        # Callbacks given every change of the public board, see publish
+        self.subscribers = []
+        # Shots that undo_shoot can revert, None unless enable_undo was called
+        self.undo_journal = None
         self.initialise_board(size)
 
     def initialise_board(self, size):
@@ -104,7 +123,7 @@ class Board:
         self.private_board = []
         for i in range(size):
             self.private_board.append([self.WATER_TILE] * size)
-        self.public_board = deepcopy(self.private_board)
+        self.public_board = [row.copy() for row in self.private_board]
 
     def number_to_letter(self, n):
         """Converts y coordinates to the letters used to label rows on the board"""
@@ -114,20 +133,17 @@ class Board:
         """Converts letter used to label rows to a y coordinate"""
         return self.LETTER_TO_COORDINATE_MAP.index(l)
 
-    def print_board(self, showShips=False):
-        """Prints the board"""
+    def render_board(self, showShips=False) -> str:
+        """Returns the board as print_board prints it"""
         if showShips:
             board = self.private_board
         else:
             board = self.public_board
-        print("   0   1   2   3   4   5   6   7   8   9")
-        for y in range(self.board_width):
-            print(" " + "+---" * self.board_width + "+")
-            print(self.number_to_letter(y), end="")
-            for x in range(self.board_width):
-                print("| " + board[x][y] + " ", end="")
-            print("|")
-        print(" " + "+---" * self.board_width + "+")
+        return render_frame(board, self.LETTER_TO_COORDINATE_MAP)
+
+    def print_board(self, showShips=False):
+        """Prints the board"""
+        print(self.render_board(showShips))
 
     def generate_ship_positions(self, ship_art: str, startX: int, startY: int, orientation: str) -> list[int, int]:
         """Returns list of coordinates for all sections of a ship based on its size, position and orientation"""
@@ -142,7 +158,7 @@ class Board:
         return positions
 
     def is_on_board(self, x, y):
-        return (0 <= x <= 9) and (0 <= y <= 9)
+        return (0 <= x < self.board_width) and (0 <= y < self.board_width)
 
     def is_water_tile(self, x, y):
         return self.private_board[x][y] == self.WATER_TILE
@@ -156,6 +172,12 @@ class Board:
     def is_ship_tile(self, x, y):
         return self.private_board[x][y] in self.SHIP_TILE_TO_NAME.keys()
 
+    def shot_cells(self) -> list[int]:
+        """Returns the cell ids of every tile of the public board that is not water"""
+        board_width = self.board_width
+        return [x * board_width + y for x, column in enumerate(self.public_board)
+                for y, tile in enumerate(column) if tile != self.WATER_TILE]
+
     def is_valid_ship_location(self, ship_positions: list[int, int]):
         """Returns true if all proposed position of a ship on water tiles and within the board"""
         for x, y in ship_positions:
@@ -168,24 +190,32 @@ class Board:
         ship_letter = ship[0]
         for x, y in ship_positions:
             self.private_board[x][y] = ship_letter
+        if ship_letter not in self.ship_health_bars:
+            self.remaining_health += len(ship)
         self.ship_positions.setdefault(ship_letter, ship_positions)
         self.ship_health_bars.setdefault(ship_letter, len(ship))
 
-    def auto_place_ships(self):
-        """Places all available ships on the map. Mainly used to place the AI fleet"""
-        for ship in self.SHIP_ART:
-            keep_searching = True
-            # Attempt to find valid x coordinate, y coordinate and orientation that allows us to
-            # place a ship. When a ship can be placed, place the ship.
-            # Repeat until all ships are placed.
-            while keep_searching:
-                start_x = randint(0, self.board_width - 1)
-                start_y = randint(0, self.board_width - 1)
-                orientation = choice(("H", "V"))
-                ship_positions = self.generate_ship_positions(ship, start_x, start_y, orientation)
-                if self.is_valid_ship_location(ship_positions):
-                    keep_searching = False
-                    self.place_ship(ship, ship_positions)
+    def auto_place_ships(self, uniform=False):
+        """Places all available ships on the map. Mainly used to place the AI fleet
+        Ships are drawn from the precomputed placements still open to them, so there are no retries. With uniform
+        every complete fleet is equally likely instead of each ship given the ships placed before it. Boards too large
+        to index draw from random_sparse_fleet, which gives fleets with the same chances."""
+        if self.board_width > PLACEMENT_INDEX_MAX_SIZE:
+            occupied = {x * self.board_width + y for positions in self.ship_positions.values() for x, y in positions}
+            fleet = random_sparse_fleet(self.board_width, self.SHIP_ART, occupied, uniform)
+            for ship, ship_positions in zip(self.SHIP_ART, fleet):
+                self.place_ship(ship, ship_positions)
+            return
+        placement_index = get_placement_index(self.board_width)
+        occupied = 0
+        for positions in self.ship_positions.values():
+            occupied |= placement_index.positions_to_mask(positions)
+        if uniform:
+            fleet = placement_index.uniform_random_fleet(self.SHIP_ART, occupied)
+        else:
+            fleet = placement_index.random_fleet(self.SHIP_ART, occupied)
+        for ship, ship_positions in zip(self.SHIP_ART, fleet):
+            self.place_ship(ship, ship_positions)
 
     def ship_tile_to_art(self, ship_tile: str) -> str:
         """Returns ship art for a ship tile. Returns "CCCCC" for tile "C" """
@@ -202,7 +232,7 @@ class Board:
             letter = command[2]
             orientation = command[3]
             if tile in ships_to_place_tiles:
-                if number.isdigit():
+                if number.isdecimal():
                     if letter in self.LETTER_TO_COORDINATE_MAP:
                         if orientation in ("H", "V"):
                             startX = int(number)
@@ -237,9 +267,9 @@ class Board:
                 print("Ensure command is 4 items long, each item is valid and ship does not overlap another ship")
 
     def is_valid_coordinate(self, command):
-        """Returns true if a coordinate is one number (0-9) followed by one letter (A-J)"""
+        """Returns true if a coordinate is one number followed by one row label, e.g. 0 A"""
         if len(command) == 2:
-            if command[0].isdigit() and command[1] in self.LETTER_TO_COORDINATE_MAP:
+            if command[0].isdecimal() and command[1] in self.LETTER_TO_COORDINATE_MAP:
                 return True
         else:
             return False
@@ -250,21 +280,36 @@ class Board:
         y = self.letter_to_number(action[1])
         return x, y
 
+    def subscribe(self, callback):
+        """Calls callback with every change of the public board from now on, see publish"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def publish(self, x, y, old_tile, new_tile, sunk_ship=""):
+        """Sends (cell, old_tile, new_tile, sunk_ship) to every subscriber, where cell is x * board_width + y and
+        sunk_ship is the ship tile of the ship sunk by the change or "" """
+        if not self.subscribers:
+            return
+        change = (x * self.board_width + y, old_tile, new_tile, sunk_ship)
+        for callback in self.subscribers:
+            callback(change)
+
     def mark_ship_sunk(self, ship_code):
         """Change hit tiles of a sunk ship to sunk tiles on both private and public board"""
         sunk = []
         for x, y in self.ship_positions[ship_code]:
+            old_tile = self.public_board[x][y]
             self.private_board[x][y] = self.SUNK_TILE
             self.public_board[x][y] = self.SUNK_TILE
+            self.publish(x, y, old_tile, self.SUNK_TILE, ship_code)
             sunk.append([x, y])
         return sunk
 
     def is_game_over(self):
         """If health bars of all ships is 0, return True"""
-        for i in self.ship_health_bars.values():
-            if i != 0:
-                return False
-        return True
+        return self.remaining_health == 0
 
     def shoot(self, x, y) -> (bool, list[list[int]], str, bool):
         """Returns hit, sunk, ship_tile, is_game_over"""
@@ -274,19 +319,99 @@ class Board:
         if self.is_water_tile(x, y):
             self.private_board[x][y] = self.MISS_TILE
             self.public_board[x][y] = self.MISS_TILE
+            self.publish(x, y, self.WATER_TILE, self.MISS_TILE)
+            if self.undo_journal is not None:
+                self.undo_journal.append((x, y, ""))
 
         elif self.is_ship_tile(x, y):
             hit = True
             ship_tile = self.private_board[x][y]
             self.ship_health_bars[ship_tile] -= 1
+            self.remaining_health -= 1
             if self.ship_health_bars[ship_tile] == 0:
                 sunk = self.mark_ship_sunk(ship_tile)
             else:
                 self.private_board[x][y] = self.HIT_TILE
                 self.public_board[x][y] = self.HIT_TILE
+                self.publish(x, y, self.WATER_TILE, self.HIT_TILE)
+            if self.undo_journal is not None:
+                self.undo_journal.append((x, y, ship_tile))
+
+        elif self.undo_journal is not None:
+            # Shooting a tile twice changes nothing but still counts as a shot to undo
+            self.undo_journal.append((x, y, None))
 
         return hit, sunk, ship_tile, self.is_game_over()
 
+    def enable_undo(self):
+        """Starts recording shots so undo_shoot can revert them"""
+        self.undo_journal = []
+
+    def undo_shoot(self):
+        """Reverts the last shot recorded since enable_undo, publishing the changes"""
+        x, y, ship_tile = self.undo_journal.pop()
+        if ship_tile is None:
+            return
+        if not ship_tile:
+            self.private_board[x][y] = self.WATER_TILE
+            self.public_board[x][y] = self.WATER_TILE
+            self.publish(x, y, self.MISS_TILE, self.WATER_TILE)
+            return
+        if self.ship_health_bars[ship_tile] == 0:
+            # The shot sank the ship, so the other tiles of the ship go back to hit tiles
+            for ship_x, ship_y in self.ship_positions[ship_tile]:
+                if ship_x != x or ship_y != y:
+                    self.private_board[ship_x][ship_y] = self.HIT_TILE
+                    self.public_board[ship_x][ship_y] = self.HIT_TILE
+                    self.publish(ship_x, ship_y, self.SUNK_TILE, self.HIT_TILE)
+        self.ship_health_bars[ship_tile] += 1
+        self.remaining_health += 1
+        old_tile = self.public_board[x][y]
+        self.private_board[x][y] = ship_tile
+        self.public_board[x][y] = self.WATER_TILE
+        self.publish(x, y, old_tile, self.WATER_TILE)
+
+    def snapshot(self) -> tuple:
+        """Returns the game state packed into an immutable tuple for restore. Ship positions are never changed after
+        a ship is placed, so they are shared rather than copied."""
+        return (tuple("".join(row) for row in self.private_board),
+                tuple("".join(row) for row in self.public_board),
+                tuple(self.ship_positions.items()),
+                tuple(self.ship_health_bars.items()),
+                self.remaining_health)
+
+    def restore(self, snapshot: tuple):
+        """Puts the board back to the state of a snapshot, publishing every tile of the public board that changes.
+        The undo journal, if enabled, is cleared."""
+        private_rows, public_rows, ship_positions, ship_health_bars, self.remaining_health = snapshot
+        for x, (private_row, public_row) in enumerate(zip(private_rows, public_rows)):
+            self.private_board[x][:] = private_row
+            if self.subscribers:
+                for y, new_tile in enumerate(public_row):
+                    old_tile = self.public_board[x][y]
+                    if old_tile != new_tile:
+                        self.public_board[x][y] = new_tile
+                        self.publish(x, y, old_tile, new_tile)
+            else:
+                self.public_board[x][:] = public_row
+        self.ship_positions = dict(ship_positions)
+        self.ship_health_bars = dict(ship_health_bars)
+        if self.undo_journal is not None:
+            self.undo_journal = []
+
+    def clone(self) -> "Board":
+        """Returns an independent copy of the game state, much faster than deepcopy. Subscribers and the undo journal
+        are not copied."""
+        clone = object.__new__(type(self))
+        clone.__dict__.update(self.__dict__)
+        clone.private_board = [row.copy() for row in self.private_board]
+        clone.public_board = [row.copy() for row in self.public_board]
+        clone.ship_positions = self.ship_positions.copy()
+        clone.ship_health_bars = self.ship_health_bars.copy()
+        clone.subscribers = []
+        clone.undo_journal = None
+        return clone
+
     def get_message(self, hit, sunk, ship_tile):
         """Returns message to the player on status of their shots like "Hit!", "Miss!", "Enemy Carrier sunk" """
         if sunk:
@@ -315,7 +440,7 @@ class Player:
 class AIConditional:
     """AI has series of conditions based on whether it hits, misses, or sinks. It also considers which ship it sunk"""
 
-    def __init__(self, player_board: Board) -> None:
+    def __init__(self, player_board: Board, book_path=None) -> None:
         self.name = "AIConditional"
         self.player_board = player_board
         self.mode = "seek"
@@ -330,9 +455,20 @@ class AIConditional:
         self.pointer_y = None
         self.do_flank_move = False
         self.first_move = True
+        # Kind of move the last shot was: "seek", "book", "attack" or "flank", see battleship_records.MOVE_TYPES
+        self.move_type = "seek"
+        # Water tiles seek has not ruled out yet. A tile only ever loses orientations, as the board fills up and the
+        # shortest ship left gets longer, so a tile that fails get_possible_orientations once never passes again.
+        # None when it has to be rebuilt from the board, which seek does the next time it is called.
+        self.seek_cells = self.water_cells()
+        player_board.subscribe(self.on_board_change)
+        # Opening book seek plays from until the first hit, book_key is None once out of book
+        self.book = open_book(book_path, player_board.board_width) if book_path else None
+        self.book_key = self.book.empty_key if self.book else None
 
     def get_AI_action(self, hit, sunk: list, shipTile) -> tuple[int, int]:
         """Returns x,y coordinate of the AI's shot"""
+        self.move_type = "attack"
 
         if sunk:
             self.do_flank_move = False
@@ -403,18 +539,47 @@ class AIConditional:
             self.selected_orientation = valid_orientations.pop(random.randint(0, len(valid_orientations) - 1))
             return self.move_along_orientation(self.selected_orientation[0], self.selected_orientation[1])
 
+    def water_cells(self) -> "CellPool":
+        board_width = self.player_board.board_width
+        return new_cell_pool(board_width * board_width, self.player_board.shot_cells())
+
+    def on_board_change(self, change):
+        """Keeps seek_cells to water tiles as the board changes"""
+        cell, old_tile, new_tile, sunk_ship = change
+        if new_tile != self.WATER_TILE:
+            if self.seek_cells is not None:
+                self.seek_cells.discard(cell)
+        else:
+            # An undone shot can make tiles seek already ruled out viable again, so start from every water tile. A
+            # restore publishes one change per tile, so the pool is only rebuilt once, when seek next needs it.
+            self.seek_cells = None
+        if self.book_key is not None:
+            if new_tile in (self.player_board.MISS_TILE, self.player_board.HIT_TILE):
+                self.book_key = self.book.next_key(self.book_key, cell, new_tile == self.player_board.HIT_TILE)
+            else:
+                self.book_key = None
+
     def seek(self):
         """When seeking, shoot random tiles that are connected to enough tiles such that
-        the group of tiles is large enough to contain a ship."""
-        valid_move = False
-        while not valid_move:
-            self.move_x = random.randint(0, self.player_board.board_width - 1)
-            self.move_y = random.randint(0, self.player_board.board_width - 1)
-
-            if self.player_board.public_board[self.move_x][self.move_y] == self.WATER_TILE:
-                orientations = self.get_possible_orientations(self.move_x, self.move_y)
-                if orientations:
-                    return self.move_x, self.move_y
+        the group of tiles is large enough to contain a ship. Tiles drawn from seek_cells are water, and a tile
+        that fails is dropped from seek_cells so it is never drawn again. While in the opening book, seek plays the
+        book's move instead."""
+        if self.book_key is not None:
+            cell = self.book.lookup(self.book_key)
+            if cell is not None:
+                self.move_type = "book"
+                self.move_x, self.move_y = divmod(cell, self.player_board.board_width)
+                return self.move_x, self.move_y
+            self.book_key = None
+        self.move_type = "seek"
+        if self.seek_cells is None:
+            self.seek_cells = self.water_cells()
+        while True:
+            cell = self.seek_cells.random_cell()
+            self.move_x, self.move_y = divmod(cell, self.player_board.board_width)
+            if self.get_possible_orientations(self.move_x, self.move_y):
+                return self.move_x, self.move_y
+            self.seek_cells.discard(cell)
 
     def flank(self):
         """flanking is used when the first shot on a ship hits the middle of the ship
@@ -434,6 +599,7 @@ class AIConditional:
             index += 1
 
         if flank_orientation in orientations:
+            self.move_type = "flank"
             self.do_flank_move = True
             self.selected_orientation = flank_orientation.copy()
         else:
@@ -497,54 +663,143 @@ class AIConditional:
         return orientations
 
 
-def main():
+PLAYER = "player"
+AI = "AI"
+
+
+class IllegalMove(ValueError):
+    """A move Game.step cannot play: a shot off the board, no shot on the player's turn or any move once the game is
+    over"""
+
+
+class TurnResult:
+    """What happened on one turn of a Game. shooter is PLAYER or AI, the rest is as Board.shoot returns"""
+
+    def __init__(self, shooter, x, y, hit, sunk, ship_tile, is_game_over):
+        self.shooter = shooter
+        self.x = x
+        self.y = y
+        self.hit = hit
+        self.sunk = sunk
+        self.ship_tile = ship_tile
+        self.is_game_over = is_game_over
+
+
+class Game:
+    """A game of a player against an AI, with no input or output so anything can drive it: the terminal in main,
+    scripts, tests or a server. Owns both boards, whose turn it is and the AI. Boards not given are placed at random.
+    Every shot is kept in shots as (cell id, hit), the form battleship_records.encode_game takes."""
+
+    def __init__(self, AIClass=AIConditional, player_board: Board = None, enemy_board: Board = None,
+                 player_first=True):
+        if player_board is None:
+            player_board = Board(BOARD_SIZE)
+            player_board.auto_place_ships()
+        if enemy_board is None:
+            enemy_board = Board(BOARD_SIZE)
+            enemy_board.auto_place_ships()
+        self.player_board = player_board
+        self.enemy_board = enemy_board
+        self.AI = AIClass(player_board)
+        self.turn = PLAYER if player_first else AI
+        self.winner = None
+        self.shots = {PLAYER: [], AI: []}
+        # Result of the AI's last shot, which it is told on its next turn
+        self.AI_result = (False, [], "")
+
+    def is_over(self) -> bool:
+        return self.winner is not None
+
+    def step(self, action: tuple[int, int] = None) -> TurnResult:
+        """Plays the current turn and returns what happened. On the player's turn action is the (x, y) to shoot, on
+        the AI's turn it is not needed"""
+        if self.is_over():
+            raise IllegalMove("The game is over")
+        shooter = self.turn
+        if shooter == PLAYER:
+            if action is None or not self.enemy_board.is_on_board(*action):
+                raise IllegalMove(f"The player must shoot a tile on the board, not {action}")
+            x, y = action
+            target = self.enemy_board
+        else:
+            x, y = self.AI.get_AI_action(*self.AI_result)
+            target = self.player_board
+        hit, sunk, ship_tile, is_game_over = target.shoot(x, y)
+        if shooter == AI:
+            self.AI_result = (hit, sunk, ship_tile)
+        self.shots[shooter].append((x * target.board_width + y, hit))
+        if is_game_over:
+            self.winner = shooter
+        else:
+            self.turn = AI if shooter == PLAYER else PLAYER
+        return TurnResult(shooter, x, y, hit, sunk, ship_tile, is_game_over)
+
+
+def main(AIClass=AIConditional, record_path=None, ansi=False):
+    """Plays games against an AI. AIClass is any AI taking the player's board, e.g. MonteCarloAI
+    With record_path each game is appended to that game record file as two records, the player's shots at the enemy
+    fleet then the AI's shots at the player's fleet.
+    With ansi, for terminals that understand ANSI escape codes, both fleets are drawn once at the top of the screen and
+    each turn only the tiles that changed are redrawn"""
+    writer = None if record_path is None else GameRecordWriter(record_path, BOARD_SIZE, Board(BOARD_SIZE).SHIP_ART)
     print_title()
     if input("Do you need instructions (y/n)? ").lower().startswith("y"):
         print_instructions()
     while True:
         # Setup
-        is_game_over = False
-        enemy_board = Board(10)
-        enemy_board.auto_place_ships()
-        player_board = Board(10)
+        player_board = Board(BOARD_SIZE)
         player_board.place_player_ships()
+        game = Game(AIClass, player_board)
         player = Player(player_board)
-        AIPlayer = AIConditional(player_board)
-        is_player_turn = True
-
-        AI_hit = False
-        AI_sunk = []
-        AI_ship_tile = ""
-
-        while not is_game_over:
-            if is_player_turn:
-                print("[PLAYER TURN]")
-                print("Your fleet:")
-                player_board.print_board(showShips=True)
-                print("Enemy fleet:")
-                enemy_board.print_board(showShips=False)
-                x, y = player.get_player_action()
-                hit, sunk, ship_tile, is_game_over = enemy_board.shoot(x, y)
-                print(enemy_board.get_message(hit, sunk, ship_tile))
+        if ansi:
+            player_view = BoardView(game.player_board, showShips=True, top=2)
+            enemy_view = BoardView(game.enemy_board, top=player_view.bottom() + 2)
+            print("\033[2J\033[1;1HYour fleet:" + player_view.frame() + f"\033[{enemy_view.top - 1};1HEnemy fleet:"
+                  + enemy_view.frame())
+        # Messages since the player's last turn, printed together with the next turn's boards in one write
+        messages = []
+
+        while not game.is_over():
+            if game.turn == PLAYER:
+                if ansi:
+                    # Messages go below the boards, replacing the last turn's
+                    print(player_view.diff() + enemy_view.diff() + f"\033[{enemy_view.bottom() + 1};1H\033[J"
+                          + "\n".join(messages + ["[PLAYER TURN]"]))
+                else:
+                    print("\n".join(messages + ["[PLAYER TURN]", "Your fleet:",
+                                                game.player_board.render_board(showShips=True), "Enemy fleet:",
+                                                game.enemy_board.render_board(showShips=False)]))
+                messages = []
+                result = game.step(player.get_player_action())
+                messages.append(game.enemy_board.get_message(result.hit, result.sunk, result.ship_tile))
             else:
-                print("[AI TURN]")
-                x, y = AIPlayer.get_AI_action(AI_hit, AI_sunk, AI_ship_tile)
-                print("AI shot:", x, y)
-                AI_hit, AI_sunk, AI_ship_tile, is_game_over = player_board.shoot(x, y)
-
-            is_player_turn = not is_player_turn
+                result = game.step()
+                messages += ["[AI TURN]", f"AI shot: {result.x} {result.y}"]
+        if ansi:
+            print(player_view.diff() + enemy_view.diff() + f"\033[{enemy_view.bottom() + 1};1H\033[J", end="")
+            player_view.close()
+            enemy_view.close()
+        print("\n".join(messages))
 
         # Reveal everything
         print("[Your fleet]")
-        player_board.print_board(showShips=True)
+        game.player_board.print_board(showShips=True)
         print("[Enemy fleet]")
-        enemy_board.print_board(showShips=True)
-        if not is_player_turn:
+        game.enemy_board.print_board(showShips=True)
+        if game.winner == PLAYER:
             print("PLAYER VICTORY!")
         else:
             print("AI VICTORY!")
+        if writer is not None:
+            writer.add(encode_game(game.enemy_board, game.shots[PLAYER]))
+            writer.add(encode_game(game.player_board, game.shots[AI]))
+            writer.flush()
 
         if not input("Do you want to play again (y/n)? ").lower().startswith("y"):
             break
+    if writer is not None:
+        writer.close()
+
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()